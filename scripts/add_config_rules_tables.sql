@@ -176,6 +176,21 @@ CREATE TABLE IF NOT EXISTS config_drift_log (
     INDEX idx_drift_detected (detected_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Per-file scan state, lets the cache populator skip files unchanged since the last scan
+CREATE TABLE IF NOT EXISTS config_file_meta (
+    instance_id VARCHAR(16) NOT NULL,
+    file_path VARCHAR(512) NOT NULL,   -- Relative to the Minecraft dir (plugins/EliteMobs/config.yml)
+    
+    mtime_ns BIGINT NOT NULL,
+    file_size BIGINT NOT NULL,
+    rules_digest CHAR(32) NOT NULL,    -- Rules/tags/variables fingerprint the rows were resolved with
+    
+    last_scanned TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (instance_id, file_path),
+    FOREIGN KEY (instance_id) REFERENCES instances(instance_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- ============================================================================
 -- BASELINE TRACKING (for audit trail)
 -- ============================================================================
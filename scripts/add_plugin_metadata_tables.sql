@@ -65,6 +65,25 @@ CREATE TABLE IF NOT EXISTS instance_plugins (
     INDEX idx_plugin (plugin_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Per-JAR scan state, lets the metadata populator skip JARs unchanged since the last scan
+CREATE TABLE IF NOT EXISTS plugin_file_fingerprints (
+    instance_id VARCHAR(16) NOT NULL,
+    file_name VARCHAR(256) NOT NULL,   -- JAR name inside Minecraft/plugins
+    
+    mtime_ns BIGINT NOT NULL,
+    file_size BIGINT NOT NULL,
+    file_hash VARCHAR(64) NOT NULL,
+    
+    -- What the JAR resolved to, reused while the fingerprint matches
+    plugin_id VARCHAR(64) NOT NULL,
+    installed_version VARCHAR(32),
+    
+    last_scanned TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (instance_id, file_name),
+    FOREIGN KEY (instance_id) REFERENCES instances(instance_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- Datapacks tracking
 CREATE TABLE IF NOT EXISTS instance_datapacks (
     id INT AUTO_INCREMENT PRIMARY KEY,
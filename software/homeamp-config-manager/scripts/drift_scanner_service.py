@@ -41,10 +41,27 @@ class DriftScanner:
         self.scan_interval = scan_interval
         self.running = False
         
+        # Server-side prepared cursors for per-row queries, created lazily
+        self._prep_cursors = {}
+        
+        # Single timestamp shared by every row written in a scan cycle
+        self._cycle_now = None
+        
+        # instance_id -> meta_tag_ids, loaded once per scan cycle
+        self._tags_by_instance = {}
+        
         # Register signal handlers
         signal.signal(signal.SIGINT, self._handle_shutdown)
         signal.signal(signal.SIGTERM, self._handle_shutdown)
     
+    def _prepared_cursor(self, name: str):
+        """Get a reusable prepared cursor so the server only parses the SQL once"""
+        cursor = self._prep_cursors.get(name)
+        if cursor is None:
+            cursor = self.db.conn.cursor(prepared=True)
+            self._prep_cursors[name] = cursor
+        return cursor
+    
     def _handle_shutdown(self, signum, frame):
         """Handle shutdown signals"""
         logger.info(f"Received signal {signum}, shutting down...")
@@ -73,26 +90,43 @@ class DriftScanner:
     def _run_scan_cycle(self):
         """Execute one scan cycle"""
         logger.info("=== Starting drift scan cycle ===")
-        start_time = datetime.now()
+        self._cycle_now = datetime.now()
+        start_time = self._cycle_now
         
         # Get all active instances
         cursor = self.db.conn.cursor(dictionary=True)
         cursor.execute("SELECT instance_id, server_name FROM instances WHERE is_active = TRUE")
         instances = cursor.fetchall()
         
-        logger.info(f"Scanning {len(instances)} instances")
+        # Load tag assignments once instead of a subquery per rule lookup
+        cursor.execute("SELECT instance_id, meta_tag_id FROM instance_tags")
+        self._tags_by_instance = {}
+        for row in cursor.fetchall():
+            self._tags_by_instance.setdefault(row['instance_id'], []).append(row['meta_tag_id'])
+        
+        logger.info("Scanning %d instances", len(instances))
         
         drift_count = 0
         
-        for instance in instances:
-            try:
-                drifts = self._scan_instance_drift(instance['instance_id'], instance['server_name'])
-                drift_count += drifts
-            except Exception as e:
-                logger.error(f"Failed to scan {instance['instance_id']}: {e}")
+        # One transaction per cycle (single commit/fsync); a savepoint per
+        # instance lets a failed instance roll back without losing the others
+        try:
+            for instance in instances:
+                cursor.execute("SAVEPOINT instance_scan")
+                try:
+                    drifts = self._scan_instance_drift(instance['instance_id'], instance['server_name'])
+                    drift_count += drifts
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT instance_scan")
+                    logger.error("Failed to scan %s: %s", instance['instance_id'], e)
+            
+            self.db.conn.commit()
+        except Exception:
+            self.db.conn.rollback()
+            raise
         
         elapsed = (datetime.now() - start_time).total_seconds()
-        logger.info(f"Scan complete: {drift_count} drift events detected in {elapsed:.2f}s")
+        logger.info("Scan complete: %d drift events detected in %.2fs", drift_count, elapsed)
     
     def _scan_instance_drift(self, instance_id: str, server_name: str) -> int:
         """
@@ -112,52 +146,56 @@ class DriftScanner:
         """, (instance_id,))
         
         cached_configs = cursor.fetchall()
-        drift_count = 0
         
-        for config in cached_configs:
-            # Re-resolve expected value (rules may have changed)
-            expected_value, variance_type = self._resolve_expected_value(
+        # Re-resolve expected values (rules may have changed)
+        resolved = [
+            self._resolve_expected_value(
                 instance_id, server_name,
                 config['config_type'],
                 config['plugin_name'],
                 config['config_file'],
                 config['config_key']
             )
-            
-            # Check if value drifted from expected
-            actual_value = config['actual_value']
-            is_drift = False
-            
-            if expected_value is not None and actual_value != expected_value:
-                is_drift = True
-                variance_type = 'DRIFT'
-                
-                # Check if this is a new drift (wasn't drift before)
-                if not config['is_drift']:
-                    drift_count += 1
-                    self._log_new_drift(
-                        instance_id, server_name,
-                        config['config_type'],
-                        config['plugin_name'],
-                        config['config_file'],
-                        config['config_key'],
-                        expected_value, actual_value
-                    )
-            
-            # Update cache
-            cursor.execute("""
-                UPDATE config_variance_cache
-                SET expected_value = %s,
-                    variance_type = %s,
-                    is_drift = %s,
-                    last_scanned = %s
-                WHERE cache_id = %s
-            """, (expected_value, variance_type, is_drift, datetime.now(), config['cache_id']))
-        
-        self.db.conn.commit()
+            for config in cached_configs
+        ]
+        
+        # Compare all rows in one pass, then only follow up on drifted ones
+        drift_mask = [
+            expected_value is not None and config['actual_value'] != expected_value
+            for config, (expected_value, _) in zip(cached_configs, resolved)
+        ]
+        
+        drift_count = 0
+        for config, (expected_value, _), is_drift in zip(cached_configs, resolved, drift_mask):
+            # Check if this is a new drift (wasn't drift before)
+            if is_drift and not config['is_drift']:
+                drift_count += 1
+                self._log_new_drift(
+                    instance_id, server_name,
+                    config['config_type'],
+                    config['plugin_name'],
+                    config['config_file'],
+                    config['config_key'],
+                    expected_value, config['actual_value']
+                )
+        
+        # Update cache
+        self._prepared_cursor('update_cache').executemany("""
+            UPDATE config_variance_cache
+            SET expected_value = %s,
+                variance_type = %s,
+                is_drift = %s,
+                last_scanned = %s
+            WHERE cache_id = %s
+        """, [
+            (expected_value, 'DRIFT' if is_drift else variance_type, is_drift,
+             self._cycle_now, config['cache_id'])
+            for config, (expected_value, variance_type), is_drift
+            in zip(cached_configs, resolved, drift_mask)
+        ])
         
         if drift_count > 0:
-            logger.warning(f"{instance_id}: {drift_count} new drift events detected")
+            logger.warning("%s: %d new drift events detected", instance_id, drift_count)
         
         return drift_count
     
@@ -168,10 +206,15 @@ class DriftScanner:
         
         Returns: (expected_value, variance_type)
         """
-        cursor = self.db.conn.cursor(dictionary=True)
+        tag_ids = self._tags_by_instance.get(instance_id, [])
+        # IN (NULL) never matches, keeping the statement valid for untagged instances
+        tag_placeholders = ', '.join(['%s'] * len(tag_ids)) or 'NULL'
+        
+        # One prepared statement per tag count, since the SQL text differs
+        cursor = self._prepared_cursor(f'resolve_rule_{len(tag_ids)}')
         
         # Query rules in priority order (INSTANCE > META_TAG > SERVER > GLOBAL)
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT expected_value, scope, priority, is_variable
             FROM config_rules
             WHERE config_type = %s
@@ -182,24 +225,22 @@ class DriftScanner:
                   scope = 'GLOBAL'
                   OR (scope = 'SERVER' AND server_name = %s)
                   OR (scope = 'INSTANCE' AND instance_id = %s)
-                  OR (scope = 'META_TAG' AND meta_tag_id IN (
-                      SELECT meta_tag_id FROM instance_tags WHERE instance_id = %s
-                  ))
+                  OR (scope = 'META_TAG' AND meta_tag_id IN ({tag_placeholders}))
               )
             ORDER BY priority ASC
             LIMIT 1
         """, (config_type, plugin_name, config_file, config_key,
-              server_name, instance_id, instance_id))
+              server_name, instance_id, *tag_ids))
         
-        rule = cursor.fetchone()
+        rules = cursor.fetchall()
         
-        if not rule:
+        if not rules:
             return None, 'NONE'
         
-        expected_value = rule['expected_value']
+        expected_value, scope, _priority, is_variable = rules[0]
         
         # Substitute variables if needed
-        if rule['is_variable']:
+        if is_variable:
             expected_value = self._substitute_variables(instance_id, expected_value)
         
         # Determine variance type from scope
@@ -210,8 +251,8 @@ class DriftScanner:
             'GLOBAL': 'GLOBAL'
         }
         
-        variance_type = variance_map.get(rule['scope'], 'NONE')
-        if rule['is_variable']:
+        variance_type = variance_map.get(scope, 'NONE')
+        if is_variable:
             variance_type = 'VARIABLE'
         
         return expected_value, variance_type
@@ -253,9 +294,8 @@ class DriftScanner:
                       expected_value: str, actual_value: str):
         """Log newly detected drift"""
         
-        cursor = self.db.conn.cursor()
-        
         # Check if drift already logged recently (last 24 hours)
+        cursor = self._prepared_cursor('find_drift_log')
         cursor.execute("""
             SELECT drift_id FROM config_drift_log
             WHERE instance_id = %s
@@ -268,35 +308,36 @@ class DriftScanner:
             LIMIT 1
         """, (instance_id, config_type, plugin_name, config_file, config_key))
         
-        existing = cursor.fetchone()
+        rows = cursor.fetchall()
+        existing = rows[0] if rows else None
         
         if existing:
             # Update existing drift log
-            cursor.execute("""
+            self._prepared_cursor('update_drift_log').execute("""
                 UPDATE config_drift_log
                 SET actual_value = %s,
                     expected_value = %s,
                     detected_at = %s
                 WHERE drift_id = %s
-            """, (actual_value, expected_value, datetime.now(), existing[0]))
+            """, (actual_value, expected_value, self._cycle_now, existing[0]))
         else:
             # Insert new drift log
-            cursor.execute("""
+            self._prepared_cursor('insert_drift_log').execute("""
                 INSERT INTO config_drift_log
                 (instance_id, server_name, config_type, plugin_name, config_file,
                  config_key, expected_value, actual_value, severity, detected_at, status)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """, (
                 instance_id, server_name, config_type, plugin_name, config_file,
-                config_key, expected_value, actual_value, 'MEDIUM', datetime.now(), 'PENDING'
+                config_key, expected_value, actual_value, 'MEDIUM', self._cycle_now, 'PENDING'
             ))
         
-        self.db.conn.commit()
-        
-        logger.warning(
-            f"NEW DRIFT: {instance_id}/{config_type}/{plugin_name or 'standard'}/"
-            f"{config_file}:{config_key} = {actual_value} (expected {expected_value})"
-        )
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning(
+                "NEW DRIFT: %s/%s/%s/%s:%s = %s (expected %s)",
+                instance_id, config_type, plugin_name or 'standard',
+                config_file, config_key, actual_value, expected_value
+            )
 
 
 def main():
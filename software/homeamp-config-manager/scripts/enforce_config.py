@@ -12,13 +12,16 @@ from datetime import datetime
 import logging
 import yaml
 import json
+import os
 import shutil
+import stat
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
 from database.db_access import ConfigDatabase
 from core.settings import settings
+from utils.serde import json_loads, json_dumps
 
 logging.basicConfig(
     level=logging.INFO,
@@ -27,6 +30,71 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _copy_file(src, dst):
+    """
+    Copy src to a new file at dst, preserving metadata like shutil.copy2.
+    
+    Uses copy_file_range so filesystems that support it (XFS, btrfs) can share
+    extents instead of duplicating bytes; falls back to shutil.copy2 otherwise.
+    """
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            remaining = os.fstat(fsrc.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        shutil.copystat(src, dst)
+    except (AttributeError, OSError):
+        # No copy_file_range (non-Linux) or unsupported here (e.g. EXDEV on older kernels)
+        shutil.copy2(src, dst)
+    return dst
+
+
+def _replace_file(file_path: Path, fill_tmp):
+    """
+    Replace file_path via temp file + rename, never writing to the existing inode.
+    
+    Args:
+        file_path: File to replace
+        fill_tmp: Callable that creates the temp file at the path it is given
+    """
+    tmp_path = file_path.with_name(f".{file_path.name}.tmp")
+    try:
+        fill_tmp(tmp_path)
+        
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            st = None
+        
+        if st is not None:
+            # Keep the original mode and owner so the amp-owned server can still save it
+            os.chmod(tmp_path, stat.S_IMODE(st.st_mode))
+            try:
+                os.chown(tmp_path, st.st_uid, st.st_gid)
+            except PermissionError:
+                pass
+        
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _atomic_write(file_path: Path, content: str):
+    """Write file via temp file + rename"""
+    def fill(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    
+    _replace_file(file_path, fill)
+
+
 class ConfigEnforcer:
     """Enforces config rules on live instances"""
     
@@ -35,6 +103,7 @@ class ConfigEnforcer:
         self.amp_base_dir = amp_base_dir
         self.backup_dir = backup_dir
         self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self._split_cache = {}
     
     def enforce_instance(self, instance_id: str, auto_apply: bool = False):
         """
@@ -112,6 +181,7 @@ class ConfigEnforcer:
             logger.info(f"Successfully enforced rules for {instance_id}")
             
             # Mark drift as resolved
+            now = datetime.now()
             for drift in drifts:
                 cursor.execute("""
                     UPDATE config_variance_cache
@@ -119,7 +189,7 @@ class ConfigEnforcer:
                         actual_value = expected_value,
                         last_scanned = %s
                     WHERE cache_id = %s
-                """, (datetime.now(), drift['cache_id']))
+                """, (now, drift['cache_id']))
                 
                 # Update drift log
                 cursor.execute("""
@@ -132,14 +202,15 @@ class ConfigEnforcer:
                       AND config_file <=> %s
                       AND config_key <=> %s
                       AND status = 'PENDING'
-                """, (datetime.now(), instance_id, drift['config_type'],
+                """, (now, instance_id, drift['config_type'],
                       drift['plugin_name'], drift['config_file'], drift['config_key']))
             
             self.db.conn.commit()
     
     def _create_backup(self, instance_id: str, instance_path: Path, files_to_backup):
         """Create backup of config files"""
-        backup_id = f"{instance_id}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        created_at = datetime.now()
+        backup_id = f"{instance_id}-{created_at.strftime('%Y%m%d-%H%M%S')}"
         backup_path = self.backup_dir / backup_id
         backup_path.mkdir(parents=True, exist_ok=True)
         
@@ -156,10 +227,12 @@ class ConfigEnforcer:
                 dest = backup_path / config_type / (plugin_name or 'standard') / config_file
                 dest.parent.mkdir(parents=True, exist_ok=True)
                 
+                # Real copies, not hardlinks: the server and plugins rewrite
+                # their configs in place, which would change a linked backup too
                 if source.is_dir():
-                    shutil.copytree(source, dest)
+                    shutil.copytree(source, dest, copy_function=_copy_file, dirs_exist_ok=True)
                 else:
-                    shutil.copy2(source, dest)
+                    _copy_file(source, dest)
                 
                 logger.info(f"Backed up: {source.relative_to(instance_path)}")
         
@@ -167,12 +240,11 @@ class ConfigEnforcer:
         manifest = {
             'backup_id': backup_id,
             'instance_id': instance_id,
-            'created_at': datetime.now().isoformat(),
+            'created_at': created_at.isoformat(),
             'files': [f"{ct}/{pn}/{cf}" for ct, pn, cf in files_to_backup]
         }
         
-        with open(backup_path / 'manifest.json', 'w') as f:
-            json.dump(manifest, f, indent=2)
+        (backup_path / 'manifest.json').write_text(json_dumps(manifest, indent=True), encoding='utf-8')
         
         return backup_id
     
@@ -185,8 +257,7 @@ class ConfigEnforcer:
             return
         
         # Read manifest
-        with open(backup_path / 'manifest.json', 'r') as f:
-            manifest = json.load(f)
+        manifest = json_loads((backup_path / 'manifest.json').read_bytes())
         
         # Restore files
         for file_spec in manifest['files']:
@@ -208,7 +279,9 @@ class ConfigEnforcer:
                     shutil.rmtree(dest, ignore_errors=True)
                     shutil.copytree(source, dest)
                 else:
-                    shutil.copy2(source, dest)
+                    # Restore into a temp file and rename, so the backup copy is
+                    # only ever read and the live file is swapped atomically
+                    _replace_file(dest, lambda tmp_path: _copy_file(source, tmp_path))
                 
                 logger.info(f"Restored: {dest.relative_to(instance_path)}")
         
@@ -244,6 +317,7 @@ class ConfigEnforcer:
         
         # Apply fixes
         changes_made = []
+        updates = []
         for drift in drift_entries:
             config_key = drift['config_key']
             expected_value = drift['expected_value']
@@ -254,22 +328,24 @@ class ConfigEnforcer:
             
             # Apply change
             if auto_apply:
-                self._set_nested_key(config_data, config_key, expected_parsed)
-                changes_made.append(f"{config_key}: {actual_value} -> {expected_value}")
+                updates.append((config_key, expected_parsed))
+                changes_made.append((config_key, actual_value, expected_value))
             else:
-                logger.info(f"WOULD FIX: {config_key}: {actual_value} -> {expected_value}")
+                logger.info("WOULD FIX: %s: %s -> %s", config_key, actual_value, expected_value)
+        
+        self._set_nested_keys(config_data, updates)
         
         # Write config if changes applied
         if auto_apply and changes_made:
             if file_path.suffix == '.properties':
                 self._write_properties(file_path, config_data)
             else:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    yaml.dump(config_data, f, default_flow_style=False, allow_unicode=True)
+                _atomic_write(file_path, yaml.dump(config_data, default_flow_style=False, allow_unicode=True))
             
-            logger.info(f"Applied {len(changes_made)} fixes to {file_path.name}")
-            for change in changes_made:
-                logger.info(f"  - {change}")
+            logger.info("Applied %d fixes to %s", len(changes_made), file_path.name)
+            if logger.isEnabledFor(logging.INFO):
+                for config_key, actual_value, expected_value in changes_made:
+                    logger.info("  - %s: %s -> %s", config_key, actual_value, expected_value)
     
     def _read_properties(self, file_path: Path) -> dict:
         """Read .properties file"""
@@ -303,20 +379,45 @@ class ConfigEnforcer:
         for key, value in config.items():
             lines.append(f"{key}={value}\n")
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
+        _atomic_write(file_path, ''.join(lines))
+    
+    def _split_key(self, key_path: str) -> tuple:
+        """Split a dotted key path, caching the result"""
+        keys = self._split_cache.get(key_path)
+        if keys is None:
+            keys = tuple(key_path.split('.'))
+            self._split_cache[key_path] = keys
+        return keys
     
-    def _set_nested_key(self, config: dict, key_path: str, value):
-        """Set nested key in config dict (e.g., 'parent.child.key')"""
-        keys = key_path.split('.')
-        current = config
+    def _set_nested_keys(self, config: dict, updates: list):
+        """
+        Set nested keys in config dict (e.g., 'parent.child.key')
         
-        for key in keys[:-1]:
-            if key not in current or not isinstance(current[key], dict):
-                current[key] = {}
-            current = current[key]
+        Keys are applied in sorted order so siblings sharing a parent path
+        reuse the dicts already descended into for the previous key.
+        """
+        path = []        # parent keys of the current descent
+        nodes = [config]  # nodes[i] is the dict reached after path[:i]
         
-        current[keys[-1]] = value
+        for keys, value in sorted(((self._split_key(k), v) for k, v in updates),
+                                  key=lambda item: item[0]):
+            parents = keys[:-1]
+            
+            depth = 0
+            while depth < len(path) and depth < len(parents) and path[depth] == parents[depth]:
+                depth += 1
+            del path[depth:]
+            del nodes[depth + 1:]
+            
+            current = nodes[-1]
+            for key in parents[depth:]:
+                if key not in current or not isinstance(current[key], dict):
+                    current[key] = {}
+                current = current[key]
+                path.append(key)
+                nodes.append(current)
+            
+            current[keys[-1]] = value
     
     def _parse_value(self, value_str: str, value_type: str):
         """Parse string value to correct type"""
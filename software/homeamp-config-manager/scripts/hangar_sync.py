@@ -7,17 +7,19 @@ Populates hangar_slug, docs_url, and version info.
 """
 
 import sys
+import re
+import asyncio
 from pathlib import Path
-from datetime import datetime
 import logging
-import requests
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
 from database.db_access import ConfigDatabase
 from core.settings import settings
+from utils.http_client import AsyncApiClient
+from utils.plugin_updates import write_plugin_updates
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,20 +27,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_GITHUB_RE = re.compile(r'github\.com/([^/]+/[^/]+)')
 
-class HangarAPI:
+
+class HangarAPI(AsyncApiClient):
     """Hangar (PaperMC) API integration for plugin updates"""
     
     BASE_URL = "https://hangar.papermc.io/api/v1"
+    UPDATE_BATCH_SIZE = 1000
+    SCAN_CHUNK_SIZE = 500
+    
+    # Columns overwritten when the fetched value differs from the stored one
+    REPLACE_COLUMNS = ('latest_version', 'hangar_slug', 'has_cicd', 'cicd_provider')
+    # Columns only filled in while the stored value is NULL/empty
+    FILL_COLUMNS = ('github_repo', 'docs_url', 'wiki_url', 'plugin_page_url',
+                    'description', 'license', 'cicd_url')
     
     def __init__(self, db: ConfigDatabase):
+        http_config = settings.http_config
+        super().__init__(
+            settings.data_dir / 'cache' / 'http_cache.sqlite',
+            max_retries=http_config.max_retries,
+            backoff_seconds=http_config.backoff_seconds
+        )
         self.db = db
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'ArchiveSMP-ConfigManager/1.0'
-        })
     
-    def search_projects(self, query: str) -> List[Dict[str, Any]]:
+    async def search_projects(self, query: str) -> List[Dict[str, Any]]:
         """
         Search Hangar for projects
         
@@ -48,6 +62,11 @@ class HangarAPI:
         Returns:
             List of project data
         """
+        # Plugins sharing a name search concurrently; let them share one request
+        return await self._coalesce(query, lambda: self._search_projects(query))
+    
+    async def _search_projects(self, query: str) -> List[Dict[str, Any]]:
+        """Uncoalesced search request"""
         try:
             params = {
                 'q': query,
@@ -55,24 +74,19 @@ class HangarAPI:
                 'offset': 0
             }
             
-            response = self.session.get(
-                f"{self.BASE_URL}/projects",
-                params=params,
-                timeout=10
-            )
+            status, data = await self.cache.get_json(self.session, f"{self.BASE_URL}/projects", params)
             
-            if response.status_code != 200:
-                logger.warning(f"Hangar search failed for {query}: {response.status_code}")
+            if status != 200:
+                logger.warning(f"Hangar search failed for {query}: {status}")
                 return []
             
-            data = response.json()
             return data.get('result', [])
         
         except Exception as e:
             logger.error(f"Error searching Hangar for {query}: {e}")
             return []
     
-    def get_project(self, owner: str, slug: str) -> Optional[Dict[str, Any]]:
+    async def get_project(self, owner: str, slug: str) -> Optional[Dict[str, Any]]:
         """
         Get project details
         
@@ -84,21 +98,19 @@ class HangarAPI:
             Project data or None
         """
         try:
-            response = self.session.get(
-                f"{self.BASE_URL}/projects/{owner}/{slug}",
-                timeout=10
-            )
+            status, data = await self.cache.get_json(self.session, f"{self.BASE_URL}/projects/{owner}/{slug}")
             
-            if response.status_code != 200:
+            if status != 200:
                 return None
             
-            return response.json()
+            return data
         
         except Exception as e:
             logger.error(f"Error getting Hangar project {owner}/{slug}: {e}")
             return None
     
-    def get_versions(self, owner: str, slug: str, platform: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def get_versions(self, owner: str, slug: str, platform: Optional[str] = None,
+                           limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get available versions for a project
         
@@ -106,6 +118,7 @@ class HangarAPI:
             owner: Project owner username
             slug: Project slug
             platform: Platform filter ('PAPER', 'WATERFALL', 'VELOCITY')
+            limit: Maximum number of versions to return (newest first)
             
         Returns:
             List of version data
@@ -114,26 +127,28 @@ class HangarAPI:
             params = {}
             if platform:
                 params['platform'] = platform.upper()
+            if limit:
+                params['limit'] = limit
             
-            response = self.session.get(
+            status, data = await self.cache.get_json(
+                self.session,
                 f"{self.BASE_URL}/projects/{owner}/{slug}/versions",
-                params=params,
-                timeout=10
+                params
             )
             
-            if response.status_code != 200:
+            if status != 200:
                 return []
             
-            data = response.json()
             return data.get('result', [])
         
         except Exception as e:
             logger.error(f"Error getting versions for {owner}/{slug}: {e}")
             return []
     
-    def get_latest_version(self, owner: str, slug: str, platform: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    async def get_latest_version(self, owner: str, slug: str, platform: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Get latest version for a project"""
-        versions = self.get_versions(owner, slug, platform)
+        # Only the newest version is needed, so don't page through the rest
+        versions = await self.get_versions(owner, slug, platform, limit=1)
         
         if not versions:
             return None
@@ -141,13 +156,12 @@ class HangarAPI:
         # Return most recent version
         return versions[0]
     
-    def get_download_url(self, owner: str, slug: str, version_name: str, platform: str = 'PAPER') -> Optional[str]:
+    async def get_download_url(self, owner: str, slug: str, version_name: str, platform: str = 'PAPER') -> Optional[str]:
         """Get download URL for a specific version"""
         try:
-            response = self.session.get(
+            response = await self.session.get(
                 f"{self.BASE_URL}/projects/{owner}/{slug}/versions/{version_name}/{platform}/download",
-                timeout=10,
-                allow_redirects=False
+                follow_redirects=False
             )
             
             if response.status_code in (302, 303, 307, 308):
@@ -159,16 +173,31 @@ class HangarAPI:
             logger.error(f"Error getting download URL: {e}")
             return None
     
-    def update_plugin_from_hangar(self, plugin_id: str, hangar_slug: str):
-        """Update plugin metadata from Hangar"""
+    def write_plugin_updates(self, updates: List[Tuple[str, Dict[str, Any]]]):
+        """
+        Write fetched plugin metadata, only touching columns that change
+        
+        Args:
+            updates: (plugin_id, column values) pairs from update_plugin_from_hangar
+        """
+        write_plugin_updates(self.db.conn, updates, self.REPLACE_COLUMNS,
+                             self.FILL_COLUMNS, self.UPDATE_BATCH_SIZE)
+    
+    async def update_plugin_from_hangar(self, plugin_id: str, hangar_slug: str):
+        """
+        Fetch plugin metadata from Hangar
+        
+        Returns:
+            (plugin_id, column values) for write_plugin_updates,
+            or None if the project wasn't found
+        """
         logger.info(f"Updating {plugin_id} from Hangar...")
         
         # Parse slug (format: "owner/slug")
-        if '/' in hangar_slug:
-            owner, slug = hangar_slug.split('/', 1)
-        else:
+        owner, sep, slug = hangar_slug.partition('/')
+        if not sep:
             # Try to guess owner or search
-            results = self.search_projects(hangar_slug)
+            results = await self.search_projects(hangar_slug)
             if not results:
                 logger.warning(f"Could not find Hangar project: {hangar_slug}")
                 return
@@ -177,96 +206,116 @@ class HangarAPI:
             owner = results[0]['namespace']['owner']
             slug = results[0]['namespace']['slug']
         
-        # Get project details
-        project = self.get_project(owner, slug)
+        # Get project details and latest version concurrently
+        project, latest_version = await asyncio.gather(
+            self.get_project(owner, slug),
+            self.get_latest_version(owner, slug)
+        )
         
         if not project:
             logger.warning(f"Could not fetch Hangar data for {owner}/{slug}")
             return
         
-        # Get latest version
-        latest_version = self.get_latest_version(owner, slug)
-        
         # Extract metadata
         latest_ver = latest_version.get('name') if latest_version else None
+        project_settings = project.get('settings') or {}
+        license_info = project_settings.get('license') or {}
         description = project.get('description', '')
-        license_name = project.get('settings', {}).get('license', {}).get('name', '')
+        license_name = license_info.get('name', '')
         
         # URLs
         project_url = f"https://hangar.papermc.io/{owner}/{slug}"
-        docs_url = project.get('settings', {}).get('homepage')
-        wiki_url = project.get('settings', {}).get('issues')  # Often wiki is linked in issues
+        docs_url = project_settings.get('homepage')
+        wiki_url = project_settings.get('issues')  # Often wiki is linked in issues
         
         # Download URL
         download_url = None
         if latest_version:
-            download_url = self.get_download_url(owner, slug, latest_version['name'])
+            download_url = await self.get_download_url(owner, slug, latest_version['name'])
         
         # Check if has CI/CD (GitHub repo linked)
         has_cicd = False
         cicd_url = None
-        github_repo = project.get('settings', {}).get('sources')
+        github_repo = project_settings.get('sources')
         
         if github_repo and 'github.com' in github_repo:
             has_cicd = True
             # Extract repo path
-            import re
-            match = re.search(r'github\.com/([^/]+/[^/]+)', github_repo)
+            match = _GITHUB_RE.search(github_repo)
             if match:
                 repo_path = match.group(1).rstrip('/')
                 cicd_url = f"https://github.com/{repo_path}/actions"
                 github_repo = repo_path
         
-        # Update database
-        cursor = self.db.conn.cursor()
-        cursor.execute("""
-            UPDATE plugins
-            SET latest_version = %s,
-                hangar_slug = %s,
-                github_repo = COALESCE(github_repo, %s),
-                docs_url = COALESCE(docs_url, %s),
-                wiki_url = COALESCE(wiki_url, %s),
-                plugin_page_url = COALESCE(plugin_page_url, %s),
-                description = COALESCE(NULLIF(description, ''), %s),
-                license = COALESCE(NULLIF(license, ''), %s),
-                has_cicd = %s,
-                cicd_provider = CASE WHEN %s THEN 'github' ELSE cicd_provider END,
-                cicd_url = COALESCE(cicd_url, %s),
-                last_checked_at = %s
-            WHERE plugin_id = %s
-        """, (
-            latest_ver, f"{owner}/{slug}", github_repo,
-            docs_url, wiki_url, project_url, description, license_name,
-            has_cicd, has_cicd, cicd_url, datetime.now(), plugin_id
-        ))
-        
-        self.db.conn.commit()
-        logger.info(f"Updated {plugin_id}: v{latest_ver}")
+        logger.info(f"Fetched {plugin_id}: v{latest_ver}")
+        values = {
+            'latest_version': latest_ver,
+            'hangar_slug': f"{owner}/{slug}",
+            'has_cicd': has_cicd,
+            'github_repo': github_repo,
+            'docs_url': docs_url,
+            'wiki_url': wiki_url,
+            'plugin_page_url': project_url,
+            'description': description,
+            'license': license_name,
+            'cicd_url': cicd_url,
+        }
+        if has_cicd:
+            values['cicd_provider'] = 'github'
+        return plugin_id, values
     
-    def scan_all_plugins(self):
+    async def scan_all_plugins(self):
         """Scan all Paper plugins and try to find them on Hangar"""
-        cursor = self.db.conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT plugin_id, plugin_name, hangar_slug
-            FROM plugins
-            WHERE platform = 'paper'
-        """)
+        cursor = self.db.conn.cursor()
+        logger.info("Scanning Paper plugins on Hangar...")
         
-        plugins = cursor.fetchall()
-        logger.info(f"Scanning {len(plugins)} Paper plugins on Hangar...")
+        # Page through plugins by primary key so memory stays bounded
+        # by SCAN_CHUNK_SIZE regardless of table size
+        scanned = 0
+        last_plugin_id = ''
+        while True:
+            cursor.execute("""
+                SELECT plugin_id, plugin_name, hangar_slug
+                FROM plugins
+                WHERE platform = 'paper'
+                  AND plugin_id > %s
+                ORDER BY plugin_id
+                LIMIT %s
+            """, (last_plugin_id, self.SCAN_CHUNK_SIZE))
+            
+            plugins = cursor.fetchall()
+            if not plugins:
+                break
+            last_plugin_id = plugins[-1][0]
+            scanned += len(plugins)
+            
+            results = await asyncio.gather(
+                *(self._scan_plugin(plugin) for plugin in plugins),
+                return_exceptions=True
+            )
+            
+            pending_updates = []
+            for (_, plugin_name, _), result in zip(plugins, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Hangar scan failed for {plugin_name}: {result}")
+                elif result:
+                    pending_updates.append(result)
+            
+            self.write_plugin_updates(pending_updates)
         
-        for plugin in plugins:
-            plugin_id = plugin['plugin_id']
-            plugin_name = plugin['plugin_name']
-            hangar_slug = plugin['hangar_slug']
+        logger.info(f"Scanned {scanned} Paper plugins on Hangar")
+    
+    async def _scan_plugin(self, plugin: tuple):
+        """Find a single plugin's metadata, bounded by the shared semaphore"""
+        async with self._semaphore:
+            plugin_id, plugin_name, hangar_slug = plugin
             
             # If we already have hangar_slug, update from it
             if hangar_slug:
-                self.update_plugin_from_hangar(plugin_id, hangar_slug)
-                continue
+                return await self.update_plugin_from_hangar(plugin_id, hangar_slug)
             
             # Otherwise, try to search for it
-            results = self.search_projects(plugin_name)
+            results = await self.search_projects(plugin_name)
             
             if results:
                 # Look for exact match
@@ -283,7 +332,7 @@ class HangarAPI:
                 slug = exact_match['namespace']['slug']
                 
                 logger.info(f"Found {plugin_name} on Hangar: {owner}/{slug}")
-                self.update_plugin_from_hangar(plugin_id, f"{owner}/{slug}")
+                return await self.update_plugin_from_hangar(plugin_id, f"{owner}/{slug}")
             else:
                 logger.info(f"No Hangar project found for {plugin_name}")
 
@@ -312,17 +361,20 @@ def main():
     )
     db.connect()
     
-    try:
-        api = HangarAPI(db)
-        
-        if args.scan_plugins:
-            api.scan_all_plugins()
-        elif args.update_plugin and args.hangar_slug:
-            api.update_plugin_from_hangar(args.update_plugin, args.hangar_slug)
-        else:
-            # Default: scan all
-            api.scan_all_plugins()
+    async def run():
+        async with HangarAPI(db) as api:
+            if args.scan_plugins:
+                await api.scan_all_plugins()
+            elif args.update_plugin and args.hangar_slug:
+                row = await api.update_plugin_from_hangar(args.update_plugin, args.hangar_slug)
+                if row:
+                    api.write_plugin_updates([row])
+            else:
+                # Default: scan all
+                await api.scan_all_plugins()
     
+    try:
+        asyncio.run(run())
     finally:
         db.disconnect()
 
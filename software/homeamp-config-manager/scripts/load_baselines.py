@@ -24,6 +24,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Rows per executemany call (rewritten into one multi-row INSERT)
+BATCH_SIZE = 10000
+
+# Stored value_type per Python type; exact type() lookup keeps bool apart from int
+_TYPE_MAP = {
+    type(None): 'null',
+    bool: 'boolean',
+    int: 'integer',
+    float: 'float',
+    str: 'string',
+    list: 'list',
+    dict: 'dict',
+}
+
 
 def load_baselines_to_db():
     """Load all baseline configs into database"""
@@ -49,6 +63,9 @@ def load_baselines_to_db():
         
         snapshot_id = f"baseline-load-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
         
+        # Load existing GLOBAL rules for all plugins in one query
+        existing_rules = fetch_existing_global_rules(db, plugins)
+        
         for plugin_name in plugins:
             logger.info(f"Processing {plugin_name}...")
             
@@ -63,12 +80,18 @@ def load_baselines_to_db():
             insert_baseline_snapshot(db, snapshot_id, plugin_name, baseline_config)
             
             # Create GLOBAL rules for each config key
-            create_global_rules(db, plugin_name, baseline_config)
+            create_global_rules(db, plugin_name, baseline_config, existing_rules)
             
             logger.info(f"Loaded {len(baseline_config)} config keys for {plugin_name}")
         
+        # Whole load is one transaction (autocommit is off)
+        db.commit()
         logger.info(f"Successfully loaded {len(plugins)} baselines")
         
+    except Exception:
+        db.rollback()
+        raise
+    
     finally:
         db.disconnect()
 
@@ -76,33 +99,35 @@ def load_baselines_to_db():
 def insert_baseline_snapshot(db, snapshot_id: str, plugin_name: str, config: dict):
     """Insert baseline snapshot into database"""
     
-    cursor = db.connection.cursor()
+    cursor = db.conn.cursor()
+    now = datetime.now()
+    
+    # Assume config.yml as default file (can be enhanced later)
+    config_file = "config.yml"
+    notes = f"Loaded from {plugin_name}_universal_config.md"
     
+    rows = []
     for config_key, value in config.items():
-        # Assume config.yml as default file (can be enhanced later)
-        config_file = "config.yml"
-        
         # Convert value to string for storage
         value_str = str(value) if value is not None else None
         
         # Determine value type
-        value_type = type(value).__name__
-        if value is None:
-            value_type = 'null'
-        elif isinstance(value, bool):
-            value_type = 'boolean'
-        elif isinstance(value, int):
-            value_type = 'integer'
-        elif isinstance(value, float):
-            value_type = 'float'
-        elif isinstance(value, str):
-            value_type = 'string'
-        elif isinstance(value, list):
-            value_type = 'list'
-        elif isinstance(value, dict):
-            value_type = 'dict'
+        value_cls = type(value)
+        value_type = _TYPE_MAP.get(value_cls) or value_cls.__name__
         
-        cursor.execute("""
+        rows.append((
+            snapshot_id,
+            plugin_name,
+            config_file,
+            config_key,
+            value_str,
+            value_type,
+            now,
+            notes
+        ))
+    
+    for i in range(0, len(rows), BATCH_SIZE):
+        cursor.executemany("""
             INSERT INTO baseline_snapshots 
             (snapshot_id, plugin_name, config_file, config_key, expected_value, 
              value_type, created_at, notes)
@@ -111,39 +136,38 @@ def insert_baseline_snapshot(db, snapshot_id: str, plugin_name: str, config: dic
                 expected_value = VALUES(expected_value),
                 value_type = VALUES(value_type),
                 created_at = VALUES(created_at)
-        """, (
-            snapshot_id,
-            plugin_name,
-            config_file,
-            config_key,
-            value_str,
-            value_type,
-            datetime.now(),
-            f"Loaded from {plugin_name}_universal_config.md"
-        ))
+        """, rows[i:i + BATCH_SIZE])
+
+
+def fetch_existing_global_rules(db, plugin_names: list) -> set:
+    """Get (plugin_name, config_file, config_key) of existing GLOBAL plugin rules"""
     
-    db.connection.commit()
+    if not plugin_names:
+        return set()
+    
+    cursor = db.conn.cursor()
+    placeholders = ', '.join(['%s'] * len(plugin_names))
+    cursor.execute(f"""
+        SELECT plugin_name, config_file, config_key FROM config_rules
+        WHERE scope = 'GLOBAL'
+          AND config_type = 'plugin'
+          AND plugin_name IN ({placeholders})
+    """, list(plugin_names))
+    
+    return set(cursor.fetchall())
 
 
-def create_global_rules(db, plugin_name: str, config: dict):
+def create_global_rules(db, plugin_name: str, config: dict, existing: set):
     """Create GLOBAL priority rules for baseline configs"""
     
-    cursor = db.connection.cursor()
+    cursor = db.conn.cursor()
+    now = datetime.now()
+    config_file = "config.yml"
+    notes = f"Auto-created from baseline: {plugin_name}_universal_config.md"
     
+    rows = []
     for config_key, value in config.items():
-        config_file = "config.yml"
-        
-        # Check if rule already exists
-        cursor.execute("""
-            SELECT rule_id FROM config_rules
-            WHERE config_type = 'plugin'
-              AND plugin_name = %s
-              AND config_file = %s
-              AND config_key = %s
-              AND scope = 'GLOBAL'
-        """, (plugin_name, config_file, config_key))
-        
-        if cursor.fetchone():
+        if (plugin_name, config_file, config_key) in existing:
             # Rule already exists, skip
             continue
         
@@ -155,13 +179,7 @@ def create_global_rules(db, plugin_name: str, config: dict):
         if isinstance(value, str) and '{{' in value and '}}' in value:
             is_variable = True
         
-        # Create GLOBAL rule
-        cursor.execute("""
-            INSERT INTO config_rules
-            (config_type, plugin_name, config_file, config_key, expected_value,
-             scope, priority, is_variable, created_at, notes)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
+        rows.append((
             'plugin',
             plugin_name,
             config_file,
@@ -170,11 +188,18 @@ def create_global_rules(db, plugin_name: str, config: dict):
             'GLOBAL',
             4,  # GLOBAL = priority 4
             is_variable,
-            datetime.now(),
-            f"Auto-created from baseline: {plugin_name}_universal_config.md"
+            now,
+            notes
         ))
     
-    db.connection.commit()
+    # Create GLOBAL rules
+    for i in range(0, len(rows), BATCH_SIZE):
+        cursor.executemany("""
+            INSERT INTO config_rules
+            (config_type, plugin_name, config_file, config_key, expected_value,
+             scope, priority, is_variable, created_at, notes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, rows[i:i + BATCH_SIZE])
 
 
 if __name__ == '__main__':
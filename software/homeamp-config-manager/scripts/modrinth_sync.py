@@ -7,17 +7,20 @@ Populates modrinth_id, docs_url, and version info.
 """
 
 import sys
+import json
+import asyncio
 from pathlib import Path
 from datetime import datetime
 import logging
-import requests
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
 from database.db_access import ConfigDatabase
 from core.settings import settings
+from utils.http_client import AsyncApiClient
+from utils.plugin_updates import write_plugin_updates
 
 logging.basicConfig(
     level=logging.INFO,
@@ -26,19 +29,37 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class ModrinthAPI:
+class ModrinthAPI(AsyncApiClient):
     """Modrinth API integration for plugin/mod updates"""
     
     BASE_URL = "https://api.modrinth.com/v2"
+    UPDATE_BATCH_SIZE = 1000
+    SCAN_CHUNK_SIZE = 500
+    BULK_CHUNK_SIZE = 100
+    
+    # Columns overwritten when the fetched value differs from the stored one
+    REPLACE_COLUMNS = ('latest_version', 'modrinth_id')
+    # Columns only filled in while the stored value is NULL/empty
+    FILL_COLUMNS = ('docs_url', 'plugin_page_url', 'description', 'license')
+    
+    DATAPACK_UPDATE_SQL = """
+        UPDATE instance_datapacks
+        SET modrinth_id = %s,
+            version = %s,
+            last_checked_at = %s
+        WHERE datapack_name = %s
+    """
     
     def __init__(self, db: ConfigDatabase):
+        http_config = settings.http_config
+        super().__init__(
+            settings.data_dir / 'cache' / 'http_cache.sqlite',
+            max_retries=http_config.max_retries,
+            backoff_seconds=http_config.backoff_seconds
+        )
         self.db = db
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'ArchiveSMP-ConfigManager/1.0'
-        })
     
-    def search_project(self, query: str, project_type: str = 'plugin') -> Optional[Dict[str, Any]]:
+    async def search_project(self, query: str, project_type: str = 'plugin') -> Optional[Dict[str, Any]]:
         """
         Search Modrinth for a project
         
@@ -49,6 +70,11 @@ class ModrinthAPI:
         Returns:
             Project data or None
         """
+        # Plugins sharing a name search concurrently; let them share one request
+        return await self._coalesce((query, project_type), lambda: self._search_project(query, project_type))
+    
+    async def _search_project(self, query: str, project_type: str = 'plugin') -> Optional[Dict[str, Any]]:
+        """Uncoalesced search request"""
         try:
             params = {
                 'query': query,
@@ -56,17 +82,12 @@ class ModrinthAPI:
                 'limit': 5
             }
             
-            response = self.session.get(
-                f"{self.BASE_URL}/search",
-                params=params,
-                timeout=10
-            )
+            status, data = await self.cache.get_json(self.session, f"{self.BASE_URL}/search", params)
             
-            if response.status_code != 200:
-                logger.warning(f"Modrinth search failed for {query}: {response.status_code}")
+            if status != 200:
+                logger.warning(f"Modrinth search failed for {query}: {status}")
                 return None
             
-            data = response.json()
             hits = data.get('hits', [])
             
             if not hits:
@@ -83,7 +104,7 @@ class ModrinthAPI:
             logger.error(f"Error searching Modrinth for {query}: {e}")
             return None
     
-    def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+    async def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
         """
         Get project details by ID or slug
         
@@ -94,21 +115,60 @@ class ModrinthAPI:
             Project data or None
         """
         try:
-            response = self.session.get(
-                f"{self.BASE_URL}/project/{project_id}",
-                timeout=10
-            )
+            status, data = await self.cache.get_json(self.session, f"{self.BASE_URL}/project/{project_id}")
             
-            if response.status_code != 200:
+            if status != 200:
                 return None
             
-            return response.json()
+            return data
         
         except Exception as e:
             logger.error(f"Error getting Modrinth project {project_id}: {e}")
             return None
     
-    def get_versions(self, project_id: str, game_version: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def get_projects_bulk(self, project_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get many projects via the batch endpoint, BULK_CHUNK_SIZE ids per request
+        
+        Args:
+            project_ids: Project IDs or slugs
+            
+        Returns:
+            Project data keyed by both project ID and slug
+        """
+        async def fetch_chunk(chunk: List[str]) -> List[Dict[str, Any]]:
+            try:
+                status, data = await self.cache.get_json(
+                    self.session,
+                    f"{self.BASE_URL}/projects",
+                    {'ids': json.dumps(chunk)}
+                )
+                
+                if status != 200:
+                    logger.warning(f"Modrinth bulk project fetch failed: {status}")
+                    return []
+                
+                return data
+            
+            except Exception as e:
+                logger.error(f"Error bulk fetching Modrinth projects: {e}")
+                return []
+        
+        ids = sorted(set(project_ids))
+        chunks = await asyncio.gather(*(
+            fetch_chunk(ids[i:i + self.BULK_CHUNK_SIZE])
+            for i in range(0, len(ids), self.BULK_CHUNK_SIZE)
+        ))
+        
+        projects = {}
+        for chunk in chunks:
+            for project in chunk:
+                projects[project['id']] = project
+                projects[project['slug']] = project
+        
+        return projects
+    
+    async def get_versions(self, project_id: str, game_version: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get available versions for a project
         
@@ -117,61 +177,83 @@ class ModrinthAPI:
             game_version: Minecraft version filter (e.g., '1.21.3')
             
         Returns:
-            List of version data
+            List of version data, newest first, without changelogs
         """
         try:
-            params = {}
+            # Changelogs are most of the payload and never used here
+            params = {'include_changelog': 'false'}
             if game_version:
                 params['game_versions'] = f'["{game_version}"]'
             
-            response = self.session.get(
+            status, data = await self.cache.get_json(
+                self.session,
                 f"{self.BASE_URL}/project/{project_id}/version",
-                params=params,
-                timeout=10
+                params
             )
             
-            if response.status_code != 200:
+            if status != 200:
                 return []
             
-            return response.json()
+            return data
         
         except Exception as e:
             logger.error(f"Error getting versions for {project_id}: {e}")
             return []
     
-    def get_latest_version(self, project_id: str, game_version: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        """Get latest version for a project"""
-        versions = self.get_versions(project_id, game_version)
+    async def get_latest_version(self, project_id: str, game_version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get latest release version for a project, falling back to the newest version"""
+        versions = await self.get_versions(project_id, game_version)
         
         if not versions:
             return None
         
-        # Filter for release versions (not beta/alpha)
-        release_versions = [v for v in versions if v.get('version_type') == 'release']
-        
-        if release_versions:
-            return release_versions[0]
+        # Prefer the newest release (not beta/alpha)
+        return next((v for v in versions if v.get('version_type') == 'release'), versions[0])
+    
+    def write_plugin_updates(self, updates: List[Tuple[str, Dict[str, Any]]]):
+        """
+        Write fetched plugin metadata, only touching columns that change
         
-        return versions[0]
+        Args:
+            updates: (plugin_id, column values) pairs from update_plugin_from_modrinth
+        """
+        write_plugin_updates(self.db.conn, updates, self.REPLACE_COLUMNS,
+                             self.FILL_COLUMNS, self.UPDATE_BATCH_SIZE)
     
-    def update_plugin_from_modrinth(self, plugin_id: str, modrinth_project_id: str):
-        """Update plugin metadata from Modrinth"""
+    async def update_plugin_from_modrinth(self, plugin_id: str, modrinth_project_id: str,
+                                          project: Optional[Dict[str, Any]] = None):
+        """
+        Fetch plugin metadata from Modrinth
+        
+        Args:
+            plugin_id: Plugin to update
+            modrinth_project_id: Modrinth project ID or slug
+            project: Already fetched project data (skips the project request)
+            
+        Returns:
+            (plugin_id, column values) for write_plugin_updates,
+            or None if the project wasn't found
+        """
         logger.info(f"Updating {plugin_id} from Modrinth...")
         
-        # Get project details
-        project = self.get_project(modrinth_project_id)
+        # Get project details and latest version concurrently
+        if project:
+            latest_version = await self.get_latest_version(modrinth_project_id)
+        else:
+            project, latest_version = await asyncio.gather(
+                self.get_project(modrinth_project_id),
+                self.get_latest_version(modrinth_project_id)
+            )
         
         if not project:
             logger.warning(f"Could not fetch Modrinth data for {modrinth_project_id}")
             return
         
-        # Get latest version
-        latest_version = self.get_latest_version(modrinth_project_id)
-        
         # Extract metadata
         latest_ver = latest_version.get('version_number') if latest_version else None
         description = project.get('description', '')
-        license_name = project.get('license', {}).get('name', '') if isinstance(project.get('license'), dict) else project.get('license', '')
+        license_info = project.get('license') or ''
+        license_name = license_info.get('name', '') if isinstance(license_info, dict) else license_info
         
         # URLs
         docs_url = project.get('wiki_url') or project.get('source_url')
@@ -182,62 +264,88 @@ class ModrinthAPI:
         if latest_version and latest_version.get('files'):
             download_url = latest_version['files'][0]['url']
         
-        # Update database
-        cursor = self.db.conn.cursor()
-        cursor.execute("""
-            UPDATE plugins
-            SET latest_version = %s,
-                modrinth_id = %s,
-                docs_url = COALESCE(docs_url, %s),
-                plugin_page_url = COALESCE(plugin_page_url, %s),
-                description = COALESCE(NULLIF(description, ''), %s),
-                license = COALESCE(NULLIF(license, ''), %s),
-                last_checked_at = %s
-            WHERE plugin_id = %s
-        """, (
-            latest_ver, modrinth_project_id, docs_url, project_url,
-            description, license_name, datetime.now(), plugin_id
-        ))
-        
-        self.db.conn.commit()
-        logger.info(f"Updated {plugin_id}: v{latest_ver}")
+        logger.info(f"Fetched {plugin_id}: v{latest_ver}")
+        return plugin_id, {
+            'latest_version': latest_ver,
+            'modrinth_id': modrinth_project_id,
+            'docs_url': docs_url,
+            'plugin_page_url': project_url,
+            'description': description,
+            'license': license_name,
+        }
     
-    def scan_all_plugins(self):
+    async def scan_all_plugins(self):
         """Scan all registered plugins and try to find them on Modrinth"""
-        cursor = self.db.conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT plugin_id, plugin_name, modrinth_id, platform
-            FROM plugins
-            WHERE platform IN ('paper', 'fabric', 'neoforge')
-        """)
+        cursor = self.db.conn.cursor()
+        logger.info("Scanning plugins on Modrinth...")
         
-        plugins = cursor.fetchall()
-        logger.info(f"Scanning {len(plugins)} plugins on Modrinth...")
+        # Page through plugins by primary key so memory stays bounded
+        # by SCAN_CHUNK_SIZE regardless of table size
+        scanned = 0
+        last_plugin_id = ''
+        while True:
+            cursor.execute("""
+                SELECT plugin_id, plugin_name, modrinth_id, platform
+                FROM plugins
+                WHERE platform IN ('paper', 'fabric', 'neoforge')
+                  AND plugin_id > %s
+                ORDER BY plugin_id
+                LIMIT %s
+            """, (last_plugin_id, self.SCAN_CHUNK_SIZE))
+            
+            plugins = cursor.fetchall()
+            if not plugins:
+                break
+            last_plugin_id = plugins[-1][0]
+            scanned += len(plugins)
+            
+            # Prefetch known projects in batches instead of one request per plugin
+            projects = await self.get_projects_bulk(
+                [modrinth_id for _, _, modrinth_id, _ in plugins if modrinth_id]
+            )
+            
+            results = await asyncio.gather(
+                *(self._scan_plugin(plugin, projects) for plugin in plugins),
+                return_exceptions=True
+            )
+            
+            pending_updates = []
+            for (_, plugin_name, _, _), result in zip(plugins, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Modrinth scan failed for {plugin_name}: {result}")
+                elif result:
+                    pending_updates.append(result)
+            
+            self.write_plugin_updates(pending_updates)
         
-        for plugin in plugins:
-            plugin_id = plugin['plugin_id']
-            plugin_name = plugin['plugin_name']
-            modrinth_id = plugin['modrinth_id']
+        logger.info(f"Scanned {scanned} plugins on Modrinth")
+    
+    async def _scan_plugin(self, plugin: tuple, projects: Dict[str, Dict[str, Any]]):
+        """Find a single plugin's metadata, bounded by the shared semaphore"""
+        async with self._semaphore:
+            plugin_id, plugin_name, modrinth_id, platform = plugin
             
             # If we already have modrinth_id, update from it
             if modrinth_id:
-                self.update_plugin_from_modrinth(plugin_id, modrinth_id)
-                continue
+                return await self.update_plugin_from_modrinth(
+                    plugin_id, modrinth_id, projects.get(modrinth_id)
+                )
             
             # Otherwise, try to search for it
-            project_type = 'mod' if plugin['platform'] in ('fabric', 'neoforge') else 'plugin'
-            result = self.search_project(plugin_name, project_type)
+            project_type = 'mod' if platform in ('fabric', 'neoforge') else 'plugin'
+            result = await self.search_project(plugin_name, project_type)
             
             if result:
                 modrinth_slug = result['slug']
                 logger.info(f"Found {plugin_name} on Modrinth: {modrinth_slug}")
-                self.update_plugin_from_modrinth(plugin_id, modrinth_slug)
+                return await self.update_plugin_from_modrinth(plugin_id, modrinth_slug)
             else:
                 logger.info(f"No Modrinth project found for {plugin_name}")
     
-    def scan_datapacks(self):
+    async def scan_datapacks(self):
         """Scan datapacks and find them on Modrinth"""
-        cursor = self.db.conn.cursor(dictionary=True)
+        now = datetime.now()
+        cursor = self.db.conn.cursor()
         cursor.execute("""
             SELECT DISTINCT datapack_name, modrinth_id
             FROM instance_datapacks
@@ -247,45 +355,60 @@ class ModrinthAPI:
         datapacks = cursor.fetchall()
         logger.info(f"Scanning {len(datapacks)} datapacks on Modrinth...")
         
-        for datapack in datapacks:
-            datapack_name = datapack['datapack_name']
-            modrinth_id = datapack['modrinth_id']
+        results = await asyncio.gather(
+            *(self._resolve_datapack(datapack, now) for datapack in datapacks),
+            return_exceptions=True
+        )
+        
+        rows = []
+        for (datapack_name, _), result in zip(datapacks, results):
+            if isinstance(result, Exception):
+                logger.error(f"Modrinth scan failed for datapack {datapack_name}: {result}")
+            elif result:
+                rows.append(result)
+        
+        cursor = self.db.conn.cursor()
+        for i in range(0, len(rows), self.UPDATE_BATCH_SIZE):
+            cursor.executemany(self.DATAPACK_UPDATE_SQL, rows[i:i + self.UPDATE_BATCH_SIZE])
+        self.db.conn.commit()
+        logger.info(f"Updated {len(rows)} datapacks")
+    
+    async def _resolve_datapack(self, datapack: tuple, checked_at: datetime):
+        """
+        Find a datapack's Modrinth project and latest version
+        
+        Args:
+            datapack: (datapack_name, modrinth_id) row
+            checked_at: Scan timestamp shared by all rows
+            
+        Returns:
+            DATAPACK_UPDATE_SQL parameter row, or None if not found
+        """
+        async with self._semaphore:
+            datapack_name, modrinth_id = datapack
             
             if modrinth_id:
                 # Update from existing ID
-                project = self.get_project(modrinth_id)
-                if project:
-                    latest = self.get_latest_version(modrinth_id)
-                    version = latest.get('version_number') if latest else None
-                    
-                    cursor.execute("""
-                        UPDATE instance_datapacks
-                        SET version = %s,
-                            last_checked_at = %s
-                        WHERE datapack_name = %s
-                    """, (version, datetime.now(), datapack_name))
-                    
-                    self.db.conn.commit()
+                project, latest = await asyncio.gather(
+                    self.get_project(modrinth_id),
+                    self.get_latest_version(modrinth_id)
+                )
+                if not project:
+                    return None
             else:
                 # Search for it
-                result = self.search_project(datapack_name, 'datapack')
-                if result:
-                    modrinth_slug = result['slug']
-                    logger.info(f"Found datapack {datapack_name}: {modrinth_slug}")
-                    
-                    # Get version
-                    latest = self.get_latest_version(modrinth_slug)
-                    version = latest.get('version_number') if latest else None
-                    
-                    cursor.execute("""
-                        UPDATE instance_datapacks
-                        SET modrinth_id = %s,
-                            version = %s,
-                            last_checked_at = %s
-                        WHERE datapack_name = %s
-                    """, (modrinth_slug, version, datetime.now(), datapack_name))
-                    
-                    self.db.conn.commit()
+                result = await self.search_project(datapack_name, 'datapack')
+                if not result:
+                    return None
+                
+                modrinth_id = result['slug']
+                logger.info(f"Found datapack {datapack_name}: {modrinth_id}")
+                
+                # Get version
+                latest = await self.get_latest_version(modrinth_id)
+            
+            version = latest.get('version_number') if latest else None
+            return (modrinth_id, version, checked_at, datapack_name)
 
 
 def main():
@@ -314,20 +437,23 @@ def main():
     )
     db.connect()
     
-    try:
-        api = ModrinthAPI(db)
-        
-        if args.scan_plugins:
-            api.scan_all_plugins()
-        elif args.scan_datapacks:
-            api.scan_datapacks()
-        elif args.update_plugin and args.modrinth_id:
-            api.update_plugin_from_modrinth(args.update_plugin, args.modrinth_id)
-        else:
-            # Default: scan everything
-            api.scan_all_plugins()
-            api.scan_datapacks()
+    async def run():
+        async with ModrinthAPI(db) as api:
+            if args.scan_plugins:
+                await api.scan_all_plugins()
+            elif args.scan_datapacks:
+                await api.scan_datapacks()
+            elif args.update_plugin and args.modrinth_id:
+                row = await api.update_plugin_from_modrinth(args.update_plugin, args.modrinth_id)
+                if row:
+                    api.write_plugin_updates([row])
+            else:
+                # Default: scan everything
+                await api.scan_all_plugins()
+                await api.scan_datapacks()
     
+    try:
+        asyncio.run(run())
     finally:
         db.disconnect()
 
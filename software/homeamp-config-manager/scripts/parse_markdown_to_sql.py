@@ -6,37 +6,92 @@ Extracts YAML blocks, preserves structure, populates config_keys table
 
 import os
 import re
+import sys
+import mmap
 import yaml
 import mysql.connector
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
 import logging
 
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from utils.serde import SafeLoader
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ```yaml or ```yml followed by optional filename comment (matched on raw bytes)
+_YAML_BLOCK_RE = re.compile(rb'```(?:yaml|yml)\s*(?:#\s*(.+?))?\n(.*?)```', re.DOTALL)
+
+
+# config_keys INSERT; keys already present are skipped via the unique_key index
+_CONFIG_KEYS_INSERT = """INSERT INTO config_keys (
+    plugin_id, config_filename, file_type, key_path,
+    whitespace_prefix, comment_pre, comment_inline,
+    plugin_default_value, observed_value, data_type
+) VALUES {values}
+ON DUPLICATE KEY UPDATE id = id"""
+_CONFIG_KEYS_ROW = '(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'
+
+# config_keys.file_type by config file extension
+_FILE_TYPES = {
+    '.yml': 'yaml',
+    '.yaml': 'yaml',
+    '.json': 'json',
+    '.properties': 'properties',
+    '.toml': 'toml',
+}
+
+# (comment_pre, comment_inline) for keys without comments
+_NO_COMMENTS = ("", "")
+
 
 class MarkdownConfigParser:
     """Parse markdown files with YAML blocks into structured SQL"""
     
-    def __init__(self, db_config: Dict[str, str]):
-        self.db = mysql.connector.connect(**db_config)
-        self.cursor = self.db.cursor(dictionary=True)
+    # Rows per prepared multi-row INSERT (10 params each, well under the 65535 limit)
+    INSERT_BATCH_SIZE = 500
+    
+    def __init__(self, db_config: Optional[Dict[str, str]]):
+        """
+        Args:
+            db_config: mysql.connector connection arguments, or None for a
+                       parse-only instance (read_markdown_keys)
+        """
+        self.db = None
+        self.cursor = None
+        self.insert_cursor = None
+        # plugin_name (lowercased) -> id; complete once load_plugin_ids has run
+        self._plugin_ids: Dict[str, int] = {}
+        self._plugin_ids_complete = False
+        self._batch_insert_sql = _CONFIG_KEYS_INSERT.format(
+            values=', '.join([_CONFIG_KEYS_ROW] * self.INSERT_BATCH_SIZE)
+        )
+        if db_config is not None:
+            self.db = mysql.connector.connect(**db_config)
+            # Each markdown file is written as one transaction
+            self.db.autocommit = False
+            self.cursor = self.db.cursor(dictionary=True)
+            self.insert_cursor = self.db.cursor(prepared=True)
         
-    def extract_yaml_blocks(self, markdown_content: str) -> List[Tuple[str, str]]:
+    def extract_yaml_blocks(self, markdown_content: bytes) -> List[Tuple[str, str]]:
         """Extract YAML code blocks from markdown
         
+        Args:
+            markdown_content: Raw UTF-8 markdown, bytes or an mmap; only
+                              the matched blocks are decoded
+        
         Returns:
             List of (filename, yaml_content) tuples
         """
         blocks = []
         
-        # Pattern: ```yaml or ```yml followed by optional filename comment
-        pattern = r'```(?:yaml|yml)\s*(?:#\s*(.+?))?\n(.*?)```'
-        
-        for match in re.finditer(pattern, markdown_content, re.DOTALL):
-            filename = match.group(1) or 'config.yml'
-            yaml_content = match.group(2).strip()
+        for match in _YAML_BLOCK_RE.finditer(markdown_content):
+            filename = match.group(1).decode('utf-8') if match.group(1) else 'config.yml'
+            yaml_content = match.group(2).decode('utf-8').replace('\r\n', '\n').strip()
             blocks.append((filename.strip(), yaml_content))
             
         return blocks
@@ -46,9 +101,12 @@ class MarkdownConfigParser:
         data: Any, 
         path: str = "",
         indent_level: int = 0,
-        comments: Dict[str, str] = None
+        comments: Dict[Any, Tuple[str, str]] = None
     ) -> List[Dict]:
-        """Recursively parse YAML into flat key-value records
+        """Flatten parsed YAML into key-value records, in document order
+        
+        Walks the tree with an explicit stack rather than recursing, so
+        deeply nested configs cost no extra Python frames.
         
         Returns list of dicts with:
         - key_path: full.dotted.path
@@ -60,72 +118,61 @@ class MarkdownConfigParser:
         """
         results = []
         comments = comments or {}
-        whitespace = "  " * indent_level  # 2 spaces per level
         
-        if isinstance(data, dict):
-            for key, value in data.items():
-                current_path = f"{path}.{key}" if path else key
+        if not isinstance(data, (dict, list)):
+            return results
+        
+        # (children iterator, parent path, parent is dict, indent level)
+        stack = [(self._iter_children(data), path, isinstance(data, dict), indent_level)]
+        
+        while stack:
+            children, parent_path, in_dict, level = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                continue
+            
+            key, value = child
+            whitespace = "  " * level  # 2 spaces per level
+            is_complex = isinstance(value, (dict, list))
+            
+            if in_dict:
+                current_path = f"{parent_path}.{key}" if parent_path else key
+                comment_pre, comment_inline = comments.get(current_path, _NO_COMMENTS)
                 
-                # Get comments for this key
-                comment_pre = comments.get(f"{current_path}_pre", "")
-                comment_inline = comments.get(f"{current_path}_inline", "")
+                results.append({
+                    'key_path': current_path,
+                    # Complex types don't have scalar values
+                    'value': str(value) if value is not None and not is_complex else None,
+                    'data_type': self._get_data_type(value),
+                    'whitespace_prefix': whitespace,
+                    'comment_pre': comment_pre,
+                    'comment_inline': comment_inline
+                })
+            else:
+                current_path = f"{parent_path}[{key}]"
                 
-                if isinstance(value, (dict, list)):
-                    # Complex type - recurse but also record the parent
-                    data_type = 'dict' if isinstance(value, dict) else 'list'
-                    results.append({
-                        'key_path': current_path,
-                        'value': None,  # Complex types don't have scalar values
-                        'data_type': data_type,
-                        'whitespace_prefix': whitespace,
-                        'comment_pre': comment_pre,
-                        'comment_inline': comment_inline
-                    })
-                    results.extend(
-                        self.parse_yaml_recursive(
-                            value, 
-                            current_path, 
-                            indent_level + 1,
-                            comments
-                        )
-                    )
-                else:
-                    # Scalar value
-                    data_type = self._get_data_type(value)
+                # List items only get a record when they are scalars
+                if not is_complex:
                     results.append({
                         'key_path': current_path,
                         'value': str(value) if value is not None else None,
-                        'data_type': data_type,
-                        'whitespace_prefix': whitespace,
-                        'comment_pre': comment_pre,
-                        'comment_inline': comment_inline
-                    })
-                    
-        elif isinstance(data, list):
-            for idx, item in enumerate(data):
-                current_path = f"{path}[{idx}]"
-                if isinstance(item, (dict, list)):
-                    results.extend(
-                        self.parse_yaml_recursive(
-                            item,
-                            current_path,
-                            indent_level + 1,
-                            comments
-                        )
-                    )
-                else:
-                    data_type = self._get_data_type(item)
-                    results.append({
-                        'key_path': current_path,
-                        'value': str(item) if item is not None else None,
-                        'data_type': data_type,
+                        'data_type': self._get_data_type(value),
                         'whitespace_prefix': whitespace,
                         'comment_pre': "",
                         'comment_inline': ""
                     })
-                    
+            
+            if is_complex:
+                stack.append((self._iter_children(value), current_path, isinstance(value, dict), level + 1))
+        
         return results
     
+    @staticmethod
+    def _iter_children(data: Any):
+        """Iterate (key, value) pairs of a dict or (index, item) pairs of a list"""
+        return iter(data.items()) if isinstance(data, dict) else enumerate(data)
+    
     def _get_data_type(self, value: Any) -> str:
         """Determine SQL enum value for data type"""
         if isinstance(value, bool):
@@ -141,66 +188,102 @@ class MarkdownConfigParser:
         else:
             return 'string'
     
-    def extract_comments(self, yaml_text: str) -> Dict[str, str]:
-        """Extract comments from YAML text
+    def load_yaml_with_comments(self, yaml_text: str) -> Tuple[Any, Dict[Any, Tuple[str, str]]]:
+        """Parse YAML and its comments in a single pass
         
-        Returns dict mapping key_path to comment text
+        Comments are located from the node tree's key positions, so nested
+        keys get their full dotted path.
+        
+        Returns:
+            (data, comments) where comments maps key_path to
+            (comment_pre, comment_inline)
         """
+        loader = SafeLoader(yaml_text)
+        try:
+            root = loader.get_single_node()
+            if root is None:
+                return None, {}
+            
+            comments = self._collect_comments(loader, root, yaml_text.split('\n'))
+            return loader.construct_document(root), comments
+        finally:
+            loader.dispose()
+    
+    def _collect_comments(self, loader: SafeLoader, root: yaml.Node,
+                          lines: List[str]) -> Dict[Any, Tuple[str, str]]:
+        """Map key paths to the comments above and beside each mapping key"""
         comments = {}
-        lines = yaml_text.split('\n')
-        current_path = []
-        pending_comment = []
-        
-        for line in lines:
-            # Check for comment
-            if '#' in line:
-                parts = line.split('#', 1)
-                code_part = parts[0].strip()
-                comment_part = parts[1].strip()
-                
-                if not code_part:
-                    # Full line comment - save for next key
-                    pending_comment.append(comment_part)
-                else:
-                    # Inline comment
-                    # Try to extract key name
-                    if ':' in code_part:
-                        key = code_part.split(':')[0].strip()
-                        path = '.'.join(current_path + [key])
-                        comments[f"{path}_inline"] = comment_part
-                        
-                        if pending_comment:
-                            comments[f"{path}_pre"] = '\n'.join(pending_comment)
-                            pending_comment = []
-            else:
-                # No comment, check if it's a key definition
-                if ':' in line:
-                    key = line.split(':')[0].strip()
-                    if key and not key.startswith('-'):
-                        path = '.'.join(current_path + [key])
-                        if pending_comment:
-                            comments[f"{path}_pre"] = '\n'.join(pending_comment)
-                            pending_comment = []
-                            
+        stack = [(root, "")]
+        
+        while stack:
+            node, path = stack.pop()
+            
+            if isinstance(node, yaml.MappingNode):
+                for key_node, value_node in node.value:
+                    if not isinstance(key_node, yaml.ScalarNode) or key_node.tag == 'tag:yaml.org,2002:merge':
+                        continue
+                    
+                    key = loader.construct_object(key_node)
+                    current_path = f"{path}.{key}" if path else key
+                    key_line = key_node.start_mark.line
+                    
+                    # Full-line comments above the key, up to the previous code line
+                    pre = []
+                    for line_no in range(key_line - 1, -1, -1):
+                        stripped = lines[line_no].strip()
+                        if stripped.startswith('#'):
+                            pre.append(stripped[1:].strip())
+                        elif stripped:
+                            break
+                    
+                    # Inline comment follows the value, or the key when the value is a nested block
+                    end_mark = value_node.end_mark if value_node.end_mark.line == key_line else key_node.end_mark
+                    rest = lines[key_line][end_mark.column:].strip()
+                    if rest.startswith(':'):
+                        rest = rest[1:].lstrip()
+                    inline = rest[1:].strip() if rest.startswith('#') else ""
+                    
+                    if pre or inline:
+                        comments[current_path] = ('\n'.join(reversed(pre)), inline)
+                    
+                    stack.append((value_node, current_path))
+            
+            elif isinstance(node, yaml.SequenceNode):
+                for idx, item in enumerate(node.value):
+                    stack.append((item, f"{path}[{idx}]"))
+        
         return comments
     
+    def load_plugin_ids(self):
+        """Prefetch all plugin ids so get_or_create_plugin can skip its SELECT"""
+        self.cursor.execute("SELECT id, plugin_name FROM plugins")
+        # plugin_name compares case-insensitively in MySQL
+        self._plugin_ids = {row['plugin_name'].lower(): row['id'] for row in self.cursor.fetchall()}
+        self._plugin_ids_complete = True
+    
     def get_or_create_plugin(self, plugin_name: str, platform: str = 'universal') -> int:
         """Get plugin ID or create if doesn't exist"""
-        self.cursor.execute(
-            "SELECT id FROM plugins WHERE plugin_name = %s",
-            (plugin_name,)
-        )
-        result = self.cursor.fetchone()
+        plugin_id = self._plugin_ids.get(plugin_name.lower())
+        if plugin_id is not None:
+            return plugin_id
         
-        if result:
-            return result['id']
+        if not self._plugin_ids_complete:
+            self.cursor.execute(
+                "SELECT id FROM plugins WHERE plugin_name = %s",
+                (plugin_name,)
+            )
+            result = self.cursor.fetchone()
+            
+            if result:
+                self._plugin_ids[plugin_name.lower()] = result['id']
+                return result['id']
         
         self.cursor.execute(
             """INSERT INTO plugins (plugin_name, platform) 
                VALUES (%s, %s)""",
             (plugin_name, platform)
         )
-        self.db.commit()
+        self._plugin_ids[plugin_name.lower()] = self.cursor.lastrowid
         return self.cursor.lastrowid
     
     def insert_config_keys(
@@ -217,121 +300,151 @@ class MarkdownConfigParser:
                         False if from plugin defaults (plugin_default_value)
         """
         
-        for key_data in keys:
-            key_path = key_data['key_path']
-            
-            # Check if key already exists
-            self.cursor.execute(
-                """SELECT id FROM config_keys 
-                   WHERE plugin_id = %s 
-                   AND config_filename = %s 
-                   AND key_path = %s""",
-                (plugin_id, filename, key_path)
-            )
-            
-            if self.cursor.fetchone():
-                logger.debug(f"Key already exists: {key_path}")
-                continue
-            
-            # Determine file type from filename
-            if filename.endswith('.yml') or filename.endswith('.yaml'):
-                file_type = 'yaml'
-            elif filename.endswith('.json'):
-                file_type = 'json'
-            elif filename.endswith('.properties'):
-                file_type = 'properties'
-            elif filename.endswith('.toml'):
-                file_type = 'toml'
-            else:
-                file_type = 'yaml'  # default
-            
-            # Snapshot values go to observed_value, leave plugin_default_value NULL
-            # This allows us to later add actual plugin defaults when we get them
-            self.cursor.execute(
-                """INSERT INTO config_keys (
-                    plugin_id, config_filename, file_type, key_path,
-                    whitespace_prefix, comment_pre, comment_inline,
-                    plugin_default_value, observed_value, data_type
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
-                (
-                    plugin_id,
-                    filename,
-                    file_type,
-                    key_path,
-                    key_data['whitespace_prefix'],
-                    key_data['comment_pre'],
-                    key_data['comment_inline'],
-                    None if is_snapshot else key_data['value'],
-                    key_data['value'] if is_snapshot else None,
-                    key_data['data_type']
-                )
+        # Determine file type from filename (yaml by default)
+        file_type = _FILE_TYPES.get(Path(filename).suffix.lower(), 'yaml')
+        
+        # Keys already present are skipped by the unique_key
+        # (plugin_id, config_filename, key_path) index, not a SELECT per key
+        rows = [
+            (
+                plugin_id,
+                filename,
+                file_type,
+                key_data['key_path'],
+                key_data['whitespace_prefix'],
+                key_data['comment_pre'],
+                key_data['comment_inline'],
+                # Snapshot values go to observed_value, leave plugin_default_value NULL
+                # This allows us to later add actual plugin defaults when we get them
+                None if is_snapshot else key_data['value'],
+                key_data['value'] if is_snapshot else None,
+                key_data['data_type']
             )
+            for key_data in keys
+        ]
         
-        self.db.commit()
-        logger.info(f"Inserted {len(keys)} keys for {filename}")
+        # The no-op update leaves existing rows untouched (rowcount 0).
+        # Full batches reuse one server-side prepared multi-row INSERT, parsed
+        # once per connection; the remainder goes through executemany, which
+        # mysql.connector rewrites into a single multi-row INSERT.
+        inserted = 0
+        full = len(rows) - len(rows) % self.INSERT_BATCH_SIZE
+        for i in range(0, full, self.INSERT_BATCH_SIZE):
+            batch = rows[i:i + self.INSERT_BATCH_SIZE]
+            self.insert_cursor.execute(self._batch_insert_sql, [value for row in batch for value in row])
+            inserted += self.insert_cursor.rowcount
+        
+        if full < len(rows):
+            self.cursor.executemany(_CONFIG_KEYS_INSERT.format(values=_CONFIG_KEYS_ROW), rows[full:])
+            inserted += self.cursor.rowcount
+        
+        logger.info(f"Inserted {inserted} of {len(rows)} keys for {filename}")
     
-    def parse_markdown_file(self, markdown_path: Path, plugin_name: str):
-        """Parse a single markdown file"""
-        logger.info(f"Parsing {markdown_path.name}")
+    def read_markdown_keys(self, markdown_path: Path) -> Optional[List[Tuple[str, List[Dict]]]]:
+        """Parse a markdown file's YAML blocks into flat key records
         
-        with open(markdown_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        Pure parsing with no database access, so it can run in worker processes.
         
-        # Extract YAML blocks
-        yaml_blocks = self.extract_yaml_blocks(content)
+        Returns:
+            List of (filename, keys) tuples, or None if the file has no YAML blocks
+        """
+        logger.info(f"Parsing {markdown_path.name}")
+        
+        # Extract YAML blocks straight from a read-only mapping of the file
+        with open(markdown_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yaml_blocks = []  # mmap can't map an empty file
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                    yaml_blocks = self.extract_yaml_blocks(content)
         
         if not yaml_blocks:
             logger.warning(f"No YAML blocks found in {markdown_path.name}")
-            return
-        
-        plugin_id = self.get_or_create_plugin(plugin_name)
+            return None
         
+        parsed = []
         for filename, yaml_content in yaml_blocks:
             try:
-                # Extract comments first
-                comments = self.extract_comments(yaml_content)
-                
-                # Parse YAML
-                data = yaml.safe_load(yaml_content)
+                # Parse YAML and locate its comments
+                data, comments = self.load_yaml_with_comments(yaml_content)
                 
                 if not data:
                     logger.warning(f"Empty YAML in {filename}")
                     continue
                 
-                # Recursively parse into flat structure
-                keys = self.parse_yaml_recursive(data, comments=comments)
-                
-                # Insert into database
-                self.insert_config_keys(plugin_id, filename, keys)
+                # Flatten into key records
+                parsed.append((filename, self.parse_yaml_recursive(data, comments=comments)))
                 
             except yaml.YAMLError as e:
                 logger.error(f"YAML parse error in {filename}: {e}")
                 continue
+        
+        return parsed
+    
+    def store_markdown_keys(self, plugin_name: str, parsed: List[Tuple[str, List[Dict]]]):
+        """Insert a file's parsed keys as one transaction"""
+        known_plugin = plugin_name.lower() in self._plugin_ids
+        try:
+            plugin_id = self.get_or_create_plugin(plugin_name)
+            
+            for filename, keys in parsed:
+                self.insert_config_keys(plugin_id, filename, keys)
+            
+            self.db.commit()
+        
+        except Exception:
+            self.db.rollback()
+            if not known_plugin:
+                # A plugin row created in this transaction is gone too
+                self._plugin_ids.pop(plugin_name.lower(), None)
+            raise
+    
+    def parse_markdown_file(self, markdown_path: Path, plugin_name: str):
+        """Parse a single markdown file"""
+        parsed = self.read_markdown_keys(markdown_path)
+        if parsed is not None:
+            self.store_markdown_keys(plugin_name, parsed)
     
     def parse_all_baselines(self, baselines_dir: Path):
-        """Parse all markdown files in baselines directory"""
+        """Parse all markdown files in baselines directory
+        
+        YAML parsing runs in a process pool; inserts stay on this
+        process's connection, in file order.
+        """
         markdown_files = list(baselines_dir.glob('*_universal_config.md'))
         
         logger.info(f"Found {len(markdown_files)} markdown files")
         
-        for md_file in markdown_files:
-            # Extract plugin name from filename
-            # e.g., "Citizens_universal_config.md" -> "Citizens"
-            plugin_name = md_file.stem.replace('_universal_config', '')
-            
-            self.parse_markdown_file(md_file, plugin_name)
+        self.load_plugin_ids()
+        
+        with ProcessPoolExecutor() as executor:
+            for md_file, parsed in zip(markdown_files, executor.map(_read_markdown_keys, markdown_files)):
+                if parsed is None:
+                    continue
+                
+                # Extract plugin name from filename
+                # e.g., "Citizens_universal_config.md" -> "Citizens"
+                plugin_name = md_file.stem.replace('_universal_config', '')
+                
+                self.store_markdown_keys(plugin_name, parsed)
         
         logger.info("✓ All baselines parsed into database")
     
     def close(self):
         """Close database connection"""
-        self.cursor.close()
-        self.db.close()
+        if self.db is not None:
+            self.insert_cursor.close()
+            self.cursor.close()
+            self.db.close()
+
+
+def _read_markdown_keys(markdown_path: Path) -> Optional[List[Tuple[str, List[Dict]]]]:
+    """Process pool worker for parse_all_baselines"""
+    return MarkdownConfigParser(None).read_markdown_keys(markdown_path)
 
 
 def main():
     """Main entry point"""
-    import sys
     
     if len(sys.argv) < 2:
         print("Usage: parse_markdown_to_sql.py <baselines_dir>")
@@ -357,6 +470,10 @@ def main():
         print("Error: DB_PASSWORD environment variable required")
         sys.exit(1)
     
+    if SafeLoader is yaml.SafeLoader:
+        logger.warning("LibYAML not available, using the slower pure-Python YAML parser "
+                       "(install libyaml-dev and reinstall PyYAML to enable it)")
+    
     parser = MarkdownConfigParser(db_config)
     
     try:
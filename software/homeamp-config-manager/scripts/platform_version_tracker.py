@@ -6,14 +6,17 @@ Tracks server platform versions (Paper build, Fabric loader, NeoForge, etc.)
 and Minecraft versions for each instance.
 """
 
+import os
 import sys
+import asyncio
 from pathlib import Path
 from datetime import datetime
 import logging
-import json
 import re
-import requests
-from typing import Optional, Dict, Any
+import httpx
+from typing import Optional, Dict, Any, List
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
@@ -21,6 +24,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 from database.db_access import ConfigDatabase
 from core.settings import settings
 from amp_integration.instance_scanner import AMPInstanceScanner
+from utils.http_retry import RetryTransport
+from utils.serde import json_loads
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,10 +33,40 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Platform JAR filename patterns (examples in the _extract_* methods)
+_PAPER_JAR_RE = re.compile(r'paper-([\d.]+)-(\d+)\.jar')
+_NEOFORGE_JAR_RE = re.compile(r'neoforge-([\d.]+(?:-[a-z]+)?)', re.IGNORECASE)
+_FORGE_JAR_RE = re.compile(r'forge-([\d.]+-[\d.]+)', re.IGNORECASE)
+_VELOCITY_JAR_RE = re.compile(r'velocity-([\d.]+-[\w-]+)', re.IGNORECASE)
+
+# Properties file entries, matched over the raw file bytes
+_FABRIC_SERVER_VERSION_RE = re.compile(rb'^serverVersion=(.*)$', re.MULTILINE)
+_MC_VERSION_RE = re.compile(rb'^[ \t]*version=(.*)$', re.MULTILINE)
+
+# Platform keywords in server JAR names (neoforge before forge so it wins the overlap)
+_PLATFORM_JAR_RE = re.compile(r'paper|neoforge|forge|geyser|velocity', re.IGNORECASE)
+
 
 class PlatformVersionTracker:
     """Tracks platform and game versions for instances"""
     
+    MAX_WORKERS = 8
+    
+    UPDATE_SQL = """
+        UPDATE instances
+        SET instance_type = %s,
+            platform_version = %s,
+            minecraft_version = %s,
+            last_scanned = %s
+        WHERE instance_id = %s
+    """
+    
+    TOUCH_SQL = """
+        UPDATE instances
+        SET last_scanned = %s
+        WHERE instance_id = %s
+    """
+    
     def __init__(self, db: ConfigDatabase, amp_base_dir: Path):
         self.db = db
         self.amp_base_dir = amp_base_dir
@@ -42,65 +77,109 @@ class PlatformVersionTracker:
         instances = self.scanner.discover_instances()
         logger.info(f"Scanning {len(instances)} instances for platform versions...")
         
-        for instance in instances:
-            try:
-                self.scan_instance(instance)
-            except Exception as e:
-                logger.error(f"Failed to scan {instance['name']}: {e}", exc_info=True)
+        # Filesystem probing overlaps across threads; DB writes stay on this thread
+        rows = []
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            futures = {executor.submit(self.scan_instance, instance): instance for instance in instances}
+            for future in as_completed(futures):
+                try:
+                    row = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to scan {futures[future]['name']}: {e}", exc_info=True)
+                    continue
+                if row:
+                    rows.append(row)
+        
+        self.write_instance_updates(rows)
     
-    def scan_instance(self, instance: dict):
-        """Scan a single instance for platform versions"""
+    def scan_instance(self, instance: dict) -> Optional[tuple]:
+        """
+        Scan a single instance for platform versions
+        
+        Returns:
+            UPDATE_SQL parameter row, or None if nothing was detected
+        """
         instance_id = instance['name']
         instance_path = Path(instance['path'])
         minecraft_dir = instance_path / 'Minecraft'
         
         if not minecraft_dir.exists():
             logger.warning(f"Minecraft directory not found for {instance_id}")
-            return
+            return None
+        
+        # List the directory's JARs once for all platform checks
+        jars = self._index_jars(minecraft_dir)
         
         # Detect platform and versions
-        platform_info = self._detect_platform(minecraft_dir)
+        platform_info = self._detect_platform(minecraft_dir, jars)
         
         if not platform_info:
             logger.warning(f"Could not detect platform for {instance_id}")
-            return
+            return None
         
         # Get Minecraft version from server.properties
-        mc_version = self._get_minecraft_version(minecraft_dir)
+        mc_version = self._get_minecraft_version(minecraft_dir, jars)
         
         logger.info(
             f"{instance_id}: {platform_info['platform']} {platform_info.get('platform_version', '?')} "
             f"(MC {mc_version or '?'})"
         )
         
-        # Update database
-        cursor = self.db.conn.cursor()
-        
-        # Update instances table
-        cursor.execute("""
-            UPDATE instances
-            SET instance_type = %s,
-                platform_version = %s,
-                minecraft_version = %s,
-                last_scanned = %s
-            WHERE instance_id = %s
-        """, (
+        return (
             platform_info['platform'],
             platform_info.get('platform_version'),
             mc_version,
             datetime.now(),
             instance_id
-        ))
+        )
+    
+    def write_instance_updates(self, rows: List[tuple]):
+        """
+        Update the instances table for all scanned instances with a single commit
+        
+        Instances whose detected versions match the stored ones only get
+        last_scanned bumped instead of a full row rewrite.
+        """
+        if not rows:
+            return
         
+        cursor = self.db.conn.cursor()
+        placeholders = ', '.join(['%s'] * len(rows))
+        cursor.execute(f"""
+            SELECT instance_id, instance_type, platform_version, minecraft_version
+            FROM instances
+            WHERE instance_id IN ({placeholders})
+        """, [row[-1] for row in rows])
+        current = {row[0]: row[1:] for row in cursor.fetchall()}
+        
+        changed = []
+        unchanged = []
+        for row in rows:
+            if current.get(row[-1]) == row[:3]:
+                unchanged.append(row[3:])
+            else:
+                changed.append(row)
+        
+        if changed:
+            cursor.executemany(self.UPDATE_SQL, changed)
+        if unchanged:
+            cursor.executemany(self.TOUCH_SQL, unchanged)
         self.db.conn.commit()
+        logger.info(f"Updated {len(changed)} instances ({len(unchanged)} unchanged)")
     
-    def _detect_platform(self, minecraft_dir: Path) -> Optional[Dict[str, Any]]:
-        """Detect server platform and version"""
+    def _detect_platform(self, minecraft_dir: Path, jars: Dict[str, Path]) -> Optional[Dict[str, Any]]:
+        """
+        Detect server platform and version
+        
+        Args:
+            minecraft_dir: Instance Minecraft directory
+            jars: Platform JARs from _index_jars
+        """
         
         # Check for Paper
-        paper_jar = self._find_jar(minecraft_dir, 'paper')
+        paper_jar = jars.get('paper')
         if paper_jar:
-            version = self._extract_paper_version(paper_jar)
+            version = self._extract_paper_version(paper_jar.name)
             return {
                 'platform': 'paper',
                 'platform_version': version,
@@ -117,9 +196,9 @@ class PlatformVersionTracker:
             }
         
         # Check for NeoForge
-        neoforge_jar = self._find_jar(minecraft_dir, 'neoforge')
+        neoforge_jar = jars.get('neoforge')
         if neoforge_jar:
-            version = self._extract_neoforge_version(neoforge_jar)
+            version = self._extract_neoforge_version(neoforge_jar.name)
             return {
                 'platform': 'neoforge',
                 'platform_version': version,
@@ -127,9 +206,9 @@ class PlatformVersionTracker:
             }
         
         # Check for Forge (legacy)
-        forge_jar = self._find_jar(minecraft_dir, 'forge')
+        forge_jar = jars.get('forge')
         if forge_jar:
-            version = self._extract_forge_version(forge_jar)
+            version = self._extract_forge_version(forge_jar.name)
             return {
                 'platform': 'forge',
                 'platform_version': version,
@@ -137,7 +216,7 @@ class PlatformVersionTracker:
             }
         
         # Check for Geyser Standalone
-        geyser_jar = self._find_jar(minecraft_dir, 'geyser')
+        geyser_jar = jars.get('geyser')
         if geyser_jar:
             return {
                 'platform': 'geyser',
@@ -145,9 +224,9 @@ class PlatformVersionTracker:
             }
         
         # Check for Velocity
-        velocity_jar = self._find_jar(minecraft_dir, 'velocity')
+        velocity_jar = jars.get('velocity')
         if velocity_jar:
-            version = self._extract_velocity_version(velocity_jar)
+            version = self._extract_velocity_version(velocity_jar.name)
             return {
                 'platform': 'velocity',
                 'platform_version': version,
@@ -164,64 +243,70 @@ class PlatformVersionTracker:
         
         return None
     
-    def _find_jar(self, directory: Path, keyword: str) -> Optional[Path]:
-        """Find JAR file containing keyword"""
-        for jar_file in directory.glob('*.jar'):
-            if keyword.lower() in jar_file.name.lower():
-                return jar_file
-        return None
+    def _index_jars(self, directory: Path) -> Dict[str, Path]:
+        """Map each platform keyword to the first JAR whose name contains it"""
+        jars = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.jar'):
+                    continue
+                for match in _PLATFORM_JAR_RE.finditer(entry.name):
+                    jars.setdefault(match.group(0).lower(), Path(entry.path))
+        return jars
     
-    def _extract_paper_version(self, jar_file: Path) -> Optional[str]:
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _extract_paper_version(jar_name: str) -> Optional[str]:
         """Extract Paper build version from JAR filename"""
         # Format: paper-1.21.3-123.jar
-        match = re.search(r'paper-[\d.]+-(\d+)\.jar', jar_file.name)
+        match = _PAPER_JAR_RE.search(jar_name)
         if match:
-            build_number = match.group(1)
-            # Also extract MC version
-            mc_match = re.search(r'paper-([\d.]+)-\d+\.jar', jar_file.name)
-            if mc_match:
-                mc_version = mc_match.group(1)
-                return f"{mc_version}-{build_number}"
-            return f"build-{build_number}"
+            mc_version, build_number = match.groups()
+            return f"{mc_version}-{build_number}"
         
         return None
     
     def _extract_fabric_version(self, properties_file: Path) -> Optional[str]:
         """Extract Fabric loader version from properties"""
         try:
-            with open(properties_file, 'r') as f:
-                for line in f:
-                    if line.startswith('serverVersion='):
-                        return line.split('=', 1)[1].strip()
+            match = _FABRIC_SERVER_VERSION_RE.search(properties_file.read_bytes())
+            if match:
+                return match.group(1).decode('utf-8', 'replace').strip()
         except:
             pass
         return None
     
-    def _extract_neoforge_version(self, jar_file: Path) -> Optional[str]:
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _extract_neoforge_version(jar_name: str) -> Optional[str]:
         """Extract NeoForge version from JAR filename"""
         # Format: neoforge-21.3.5-beta.jar or similar
-        match = re.search(r'neoforge-([\d.]+(?:-[a-z]+)?)', jar_file.name, re.IGNORECASE)
+        match = _NEOFORGE_JAR_RE.search(jar_name)
         if match:
             return match.group(1)
         return None
     
-    def _extract_forge_version(self, jar_file: Path) -> Optional[str]:
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _extract_forge_version(jar_name: str) -> Optional[str]:
         """Extract Forge version from JAR filename"""
         # Format: forge-1.20.1-47.3.0.jar
-        match = re.search(r'forge-([\d.]+-[\d.]+)', jar_file.name, re.IGNORECASE)
+        match = _FORGE_JAR_RE.search(jar_name)
         if match:
             return match.group(1)
         return None
     
-    def _extract_velocity_version(self, jar_file: Path) -> Optional[str]:
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _extract_velocity_version(jar_name: str) -> Optional[str]:
         """Extract Velocity version from JAR filename"""
         # Format: velocity-3.3.0-SNAPSHOT-392.jar
-        match = re.search(r'velocity-([\d.]+-[\w-]+)', jar_file.name, re.IGNORECASE)
+        match = _VELOCITY_JAR_RE.search(jar_name)
         if match:
             return match.group(1)
         return None
     
-    def _get_minecraft_version(self, minecraft_dir: Path) -> Optional[str]:
+    def _get_minecraft_version(self, minecraft_dir: Path, jars: Dict[str, Path]) -> Optional[str]:
         """Get Minecraft version from server.properties"""
         props_file = minecraft_dir / 'server.properties'
         
@@ -232,20 +317,18 @@ class PlatformVersionTracker:
             # Try to get from version.json (for newer servers)
             version_json = minecraft_dir / 'version.json'
             if version_json.exists():
-                with open(version_json, 'r') as f:
-                    data = json.load(f)
-                    return data.get('id', data.get('name'))
+                data = json_loads(version_json.read_bytes())
+                return data.get('id', data.get('name'))
             
             # Fallback: parse from JAR filename or properties
-            with open(props_file, 'r') as f:
-                for line in f:
-                    if line.strip().startswith('version='):
-                        return line.split('=', 1)[1].strip()
+            match = _MC_VERSION_RE.search(props_file.read_bytes())
+            if match:
+                return match.group(1).decode('utf-8', 'replace').strip()
             
             # Last resort: try to extract from Paper JAR name
-            paper_jar = self._find_jar(minecraft_dir, 'paper')
+            paper_jar = jars.get('paper')
             if paper_jar:
-                match = re.search(r'paper-([\d.]+)-\d+\.jar', paper_jar.name)
+                match = _PAPER_JAR_RE.search(paper_jar.name)
                 if match:
                     return match.group(1)
         
@@ -257,18 +340,30 @@ class PlatformVersionTracker:
     def check_platform_updates(self):
         """Check for platform updates from official sources"""
         logger.info("Checking for platform updates...")
-        
-        # Check Paper builds
-        self._check_paper_updates()
-        
-        # Check Fabric loader
-        self._check_fabric_updates()
+        asyncio.run(self._check_all_updates())
     
-    def _check_paper_updates(self):
+    async def _check_all_updates(self):
+        """Run the Paper and Fabric checks concurrently over one client"""
+        http_config = settings.http_config
+        async with httpx.AsyncClient(
+            headers={'User-Agent': http_config.user_agent},
+            timeout=10.0,
+            transport=RetryTransport(
+                httpx.AsyncHTTPTransport(),
+                max_retries=http_config.max_retries,
+                backoff_seconds=http_config.backoff_seconds
+            )
+        ) as session:
+            await asyncio.gather(
+                self._check_paper_updates(session),
+                self._check_fabric_updates(session)
+            )
+    
+    async def _check_paper_updates(self, session: httpx.AsyncClient):
         """Check for latest Paper builds"""
         try:
             # Get list of Minecraft versions
-            response = requests.get('https://api.papermc.io/v2/projects/paper', timeout=10)
+            response = await session.get('https://api.papermc.io/v2/projects/paper')
             if response.status_code != 200:
                 return
             
@@ -281,9 +376,8 @@ class PlatformVersionTracker:
             latest_mc_version = versions[-1]
             
             # Get latest build for this version
-            builds_response = requests.get(
-                f'https://api.papermc.io/v2/projects/paper/versions/{latest_mc_version}',
-                timeout=10
+            builds_response = await session.get(
+                f'https://api.papermc.io/v2/projects/paper/versions/{latest_mc_version}'
             )
             
             if builds_response.status_code != 200:
@@ -299,13 +393,10 @@ class PlatformVersionTracker:
         except Exception as e:
             logger.error(f"Failed to check Paper updates: {e}")
     
-    def _check_fabric_updates(self):
+    async def _check_fabric_updates(self, session: httpx.AsyncClient):
         """Check for latest Fabric loader"""
         try:
-            response = requests.get(
-                'https://meta.fabricmc.net/v2/versions/loader',
-                timeout=10
-            )
+            response = await session.get('https://meta.fabricmc.net/v2/versions/loader')
             
             if response.status_code != 200:
                 return
@@ -6,18 +6,28 @@ Scans live instance configs and populates config_variance_cache table.
 Compares against rules to determine variance type.
 """
 
+import os
 import sys
+import hashlib
+import mmap
+import multiprocessing
+import tempfile
+import threading
 from pathlib import Path
-from datetime import datetime
 import logging
 import yaml
 import json
+import re
+
+from typing import Optional, Tuple, List, Dict, Set
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
-from database.db_access import ConfigDatabase
+from database.db_access import ConfigDatabase, ThreadLocalDatabases, retry_on_lock_conflict
 from core.settings import settings
+from utils.serde import SafeLoader
 from amp_integration.instance_scanner import AMPInstanceScanner
 
 logging.basicConfig(
@@ -26,43 +36,330 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# {{VARIABLE}} placeholder in a rule's expected value
+_VARIABLE_RE = re.compile(r'\{\{([^{}]+)\}\}')
+
+# LOAD DATA field escapes for the default tab-separated format (ESCAPED BY '\\')
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+# Stored value_type per Python type; exact type() lookup keeps bool apart from int
+_VALUE_TYPES = {
+    type(None): 'null',
+    bool: 'boolean',
+    int: 'integer',
+    float: 'float',
+    list: 'list',
+}
+
 
 class ConfigCachePopulator:
     """Populates variance cache from live configs"""
     
-    def __init__(self, db: ConfigDatabase, amp_base_dir: Path):
+    MAX_WORKERS = min(8, os.cpu_count() or 1)
+    
+    # Cache rows per prepared multi-row INSERT; the remainder goes through executemany
+    INSERT_BATCH_SIZE = 500
+    
+    # Attempts per instance transaction when it loses a lock conflict
+    WRITE_ATTEMPTS = 4
+    
+    CACHE_INSERT_SQL = """
+        INSERT INTO config_variance_cache
+        (instance_id, server_name, config_type, plugin_name, config_file,
+         config_key, actual_value, expected_value, variance_type, value_type,
+         is_drift, last_scanned)
+        VALUES {values}
+        ON DUPLICATE KEY UPDATE
+            server_name = VALUES(server_name),
+            actual_value = VALUES(actual_value),
+            expected_value = VALUES(expected_value),
+            variance_type = VALUES(variance_type),
+            value_type = VALUES(value_type),
+            is_drift = VALUES(is_drift),
+            last_scanned = VALUES(last_scanned)
+    """
+    
+    # Timestamps come from the server clock instead of a per-row parameter
+    CACHE_ROW = '(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())'
+    
+    DRIFT_INSERT_SQL = """
+        INSERT INTO config_drift_log
+        (instance_id, server_name, config_type, plugin_name, config_file,
+         config_key, expected_value, actual_value, severity, detected_at, status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s)
+    """
+    
+    # Bulk mode: rows go through a per-connection staging table loaded from a TSV file
+    BULK_COLUMNS = (
+        'instance_id, server_name, config_type, plugin_name, config_file, '
+        'config_key, actual_value, expected_value, variance_type, value_type, is_drift'
+    )
+    
+    STAGING_CREATE_SQL = """
+        CREATE TEMPORARY TABLE IF NOT EXISTS config_variance_cache_staging
+        LIKE config_variance_cache
+    """
+    
+    BULK_LOAD_SQL = f"""
+        LOAD DATA LOCAL INFILE %s
+        INTO TABLE config_variance_cache_staging
+        CHARACTER SET utf8mb4
+        ({BULK_COLUMNS})
+        SET last_scanned = NOW()
+    """
+    
+    BULK_MERGE_SQL = f"""
+        INSERT INTO config_variance_cache ({BULK_COLUMNS}, last_scanned)
+        SELECT {BULK_COLUMNS}, last_scanned FROM config_variance_cache_staging
+        ON DUPLICATE KEY UPDATE
+            server_name = VALUES(server_name),
+            actual_value = VALUES(actual_value),
+            expected_value = VALUES(expected_value),
+            variance_type = VALUES(variance_type),
+            value_type = VALUES(value_type),
+            is_drift = VALUES(is_drift),
+            last_scanned = VALUES(last_scanned)
+    """
+    
+    # Bumps last_scanned on rows that were seen again unchanged
+    CACHE_TOUCH_SQL = """
+        UPDATE config_variance_cache SET last_scanned = NOW()
+        WHERE cache_id IN ({ids})
+    """
+    
+    FILE_META_SQL = """
+        INSERT INTO config_file_meta
+        (instance_id, file_path, mtime_ns, file_size, rules_digest, last_scanned)
+        VALUES (%s, %s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+            mtime_ns = VALUES(mtime_ns),
+            file_size = VALUES(file_size),
+            rules_digest = VALUES(rules_digest),
+            last_scanned = VALUES(last_scanned)
+    """
+    
+    def __init__(self, db: ConfigDatabase, amp_base_dir: Path, workers: int = MAX_WORKERS,
+                 full_rescan: bool = False, bulk: bool = False,
+                 parse_processes: Optional[int] = None):
         self.db = db
         self.amp_base_dir = amp_base_dir
         self.scanner = AMPInstanceScanner(amp_base_dir)
+        self.workers = workers
+        # Re-read every file even if config_file_meta says it is unchanged
+        self.full_rescan = full_rescan
+        # Load cache rows with LOAD DATA LOCAL INFILE; the connection must allow local infile
+        self.bulk = bulk
+        # YAML parsing is CPU-bound and holds the GIL, so scan threads hand cache
+        # misses to worker processes; 0 parses in the scanning thread
+        self.parse_processes = (os.cpu_count() or 1) if parse_processes is None else parse_processes
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        
+        # Per-thread scan state and connections (worker threads open their own).
+        # Rows queued during an instance scan are written by _flush_pending.
+        self._local = threading.local()
+        self._dbs = ThreadLocalDatabases(db)
+        self._batch_insert_sql = self.CACHE_INSERT_SQL.format(
+            values=', '.join([self.CACHE_ROW] * self.INSERT_BATCH_SIZE)
+        )
+        
+        # (config_type, plugin_name, config_file, config_key) -> rules by priority,
+        # NULL columns are wildcards and stay None in the key
+        self._rules_index: Dict[tuple, List[dict]] = {}
+        self._instance_tags: Dict[str, Set[int]] = {}
+        self._instances: Dict[str, dict] = {}
+        self._instance_variables: Dict[str, Dict[str, str]] = {}
+        self._rules_digest = b''
+        self._load_rules()
+        
+        # Content digest -> flattened (key, value_str, value_type) leaves; the same
+        # plugin version ships identical configs to many instances
+        self._leaves_cache: Dict[bytes, List[tuple]] = {}
+    
+    def _load_rules(self):
+        """Load rules, instance tags, instances and variables once for in-memory resolution"""
+        
+        cursor = self.db.conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT config_type, plugin_name, config_file, config_key,
+                   expected_value, scope, priority, is_variable,
+                   server_name, instance_id, meta_tag_id
+            FROM config_rules
+            ORDER BY priority ASC
+        """)
+        
+        rules = cursor.fetchall()
+        for rule in rules:
+            key = (rule['config_type'], rule['plugin_name'], rule['config_file'], rule['config_key'])
+            self._rules_index.setdefault(key, []).append(rule)
+        
+        # Order-independent fingerprint, any rule change invalidates skipped files
+        self._rules_digest = hashlib.blake2b(
+            ''.join(sorted(map(repr, rules))).encode(), digest_size=16
+        ).digest()
+        
+        cursor.execute("SELECT instance_id, meta_tag_id FROM instance_tags")
+        for row in cursor.fetchall():
+            self._instance_tags.setdefault(row['instance_id'], set()).add(row['meta_tag_id'])
+        
+        cursor.execute("SELECT instance_id, server_name FROM instances")
+        self._instances = {row['instance_id']: row for row in cursor.fetchall()}
+        
+        cursor.execute("SELECT instance_id, variable_name, variable_value FROM config_variables")
+        for row in cursor.fetchall():
+            variables = self._instance_variables.setdefault(row['instance_id'], {})
+            variables[row['variable_name']] = row['variable_value']
+        
+        # Instance-specific values from the instances table
+        for instance_id, inst in self._instances.items():
+            variables = self._instance_variables.setdefault(instance_id, {})
+            variables['INSTANCE_ID'] = inst['instance_id']
+            variables['SERVER_NAME'] = inst['server_name']
+            variables['SHORTNAME'] = inst['instance_id']  # e.g., BENT01
+        
+        logger.info(f"Loaded {sum(map(len, self._rules_index.values()))} config rules")
+    
+    def _insert_cursor(self):
+        """Get the current thread's prepared cursor for full cache batches"""
+        cursor = getattr(self._local, 'insert_cursor', None)
+        if cursor is None:
+            # Statement is prepared on first execute and reused by later batches
+            cursor = self._local.insert_cursor = self._dbs.get().conn.cursor(prepared=True)
+        return cursor
     
     def populate_all_instances(self):
         """Scan all instances and populate cache"""
         
         # Discover instances
         instances = self.scanner.discover_instances()
-        logger.info(f"Found {len(instances)} instances to scan")
+        logger.info(f"Found {len(instances)} instances to scan with {self.workers} workers")
         
-        for instance in instances:
-            try:
-                self.populate_instance(instance)
-            except Exception as e:
-                logger.error(f"Failed to scan {instance['name']}: {e}", exc_info=True)
+        if self.parse_processes > 0:
+            # spawn, since forking a process that is already running scan threads is unsafe
+            self._parse_pool = ProcessPoolExecutor(
+                max_workers=self.parse_processes,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(self._populate_instance_logged, instances))
+        finally:
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown()
+                self._parse_pool = None
+            self._dbs.close_workers()
+    
+    def _populate_instance_logged(self, instance: dict):
+        """Populate one instance, logging instead of raising on failure"""
+        try:
+            self.populate_instance(instance)
+        except Exception as e:
+            logger.error(f"Failed to scan {instance['name']}: {e}", exc_info=True)
     
     def populate_instance(self, instance: dict):
         """Populate cache for a single instance"""
         instance_id = instance['name']
         logger.info(f"Scanning {instance_id}...")
         
-        # Get instance details from database
-        cursor = self.db.conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM instances WHERE instance_id = %s", (instance_id,))
-        db_instance = cursor.fetchone()
+        db = self._dbs.get()
+        
+        # Instance details were loaded with the rules
+        db_instance = self._instances.get(instance_id)
         
         if not db_instance:
             logger.warning(f"Instance {instance_id} not in database, skipping")
             return
         
         server_name = db_instance['server_name']
+        self._local.pending_rows = []
+        self._local.pending_drift = []
+        self._local.pending_meta = []
+        self._local.skipped_files = 0
+        self._local.skipped_file_keys = set()
+        self._local.file_meta = {} if self.full_rescan else self._load_file_meta(db, instance_id)
+        self._local.state_digest = self._instance_digest(instance_id, server_name)
+        self._local.cached_rows = self._load_cached_rows(db, instance_id)
+        self._local.instance_id = instance_id
+        # Files with cache rows; one whose rows were deleted is rescanned despite its meta
+        self._local.cached_files = {key[:3] for key in self._local.cached_rows}
+        
+        try:
+            self._scan_instance_files(instance, instance_id, server_name)
+            self._flush_pending()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            self._local.pending_rows = None
+            self._local.pending_drift = None
+            self._local.pending_meta = None
+            self._local.file_meta = None
+            self._local.cached_rows = None
+            self._local.cached_files = None
+            self._local.skipped_file_keys = None
+    
+    def _load_cached_rows(self, db: ConfigDatabase, instance_id: str) -> Dict[tuple, tuple]:
+        """
+        Get the instance's current variance cache rows
+        
+        Returns:
+            (config_type, plugin_name, config_file, config_key) ->
+            (cache_id, (server_name, actual_value, expected_value, variance_type,
+            value_type, is_drift)), the state laid out like a queued row minus its key
+        """
+        cursor = db.conn.cursor()
+        cursor.execute("""
+            SELECT config_type, plugin_name, config_file, config_key, cache_id,
+                   server_name, actual_value, expected_value, variance_type, value_type, is_drift
+            FROM config_variance_cache
+            WHERE instance_id = %s
+        """, (instance_id,))
+        return {row[:4]: (row[4], row[5:10] + (bool(row[10]),)) for row in cursor.fetchall()}
+    
+    def _load_file_meta(self, db: ConfigDatabase, instance_id: str) -> Dict[str, tuple]:
+        """Get file_path -> (mtime_ns, file_size, rules_digest) from the last scan"""
+        cursor = db.conn.cursor()
+        cursor.execute("""
+            SELECT file_path, mtime_ns, file_size, rules_digest
+            FROM config_file_meta
+            WHERE instance_id = %s
+        """, (instance_id,))
+        return {path: (mtime_ns, size, digest) for path, mtime_ns, size, digest in cursor.fetchall()}
+    
+    def _instance_digest(self, instance_id: str, server_name: str) -> str:
+        """Fingerprint of everything expected values depend on for an instance"""
+        state = (
+            server_name,
+            sorted(map(repr, self._instance_tags.get(instance_id, ()))),
+            sorted(self._instance_variables.get(instance_id, {}).items())
+        )
+        return hashlib.blake2b(repr(state).encode(), digest_size=16, key=self._rules_digest).hexdigest()
+    
+    def _file_unchanged(self, rel_path: str, st: os.stat_result, file_key: tuple) -> bool:
+        """
+        Check whether a file and the rules it resolves against match the last scan
+        
+        Args:
+            rel_path: Path relative to the Minecraft dir, as stored in config_file_meta
+            st: Current stat of the file
+            file_key: (config_type, plugin_name, config_file) of the file's cache rows
+        """
+        if (self._local.file_meta.get(rel_path) == (st.st_mtime_ns, st.st_size, self._local.state_digest)
+                and file_key in self._local.cached_files):
+            # Cache rows from the previous scan are still current
+            self._local.skipped_files += 1
+            self._local.skipped_file_keys.add(file_key)
+            return True
+        return False
+    
+    def _mark_scanned(self, instance_id: str, rel_path: str, st: os.stat_result):
+        """Queue the state of a file that was read successfully"""
+        self._local.pending_meta.append(
+            (instance_id, rel_path, st.st_mtime_ns, st.st_size, self._local.state_digest)
+        )
+    
+    def _scan_instance_files(self, instance: dict, instance_id: str, server_name: str):
+        """Queue cache rows for all config files of an instance"""
         
         # Scan plugin configs
         plugins_dir = Path(instance['path']) / 'Minecraft' / 'plugins'
@@ -82,29 +379,38 @@ class ConfigCachePopulator:
     def _scan_plugin_configs(self, instance_id: str, server_name: str, plugins_dir: Path):
         """Scan plugin configuration files"""
         
-        for plugin_dir in plugins_dir.iterdir():
-            if not plugin_dir.is_dir():
-                continue
-            
+        # DirEntry.is_dir/is_file use the directory listing's file type, no stat per entry
+        with os.scandir(plugins_dir) as plugin_dirs:
+            plugin_entries = [entry for entry in plugin_dirs if entry.is_dir()]
+        
+        for plugin_dir in plugin_entries:
             plugin_name = plugin_dir.name
             
+            with os.scandir(plugin_dir.path) as entries:
+                config_files = [
+                    entry for entry in entries
+                    if entry.name.endswith(('.yml', '.yaml')) and entry.is_file()
+                ]
+            
             # Scan YAML config files
-            for config_file in list(plugin_dir.glob("*.yml")) + list(plugin_dir.glob("*.yaml")):
+            for config_file in config_files:
                 try:
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        config_data = yaml.safe_load(f)
-                    
-                    if not config_data:
+                    rel_path = f"plugins/{plugin_name}/{config_file.name}"
+                    st = config_file.stat()
+                    if self._file_unchanged(rel_path, st, ('plugin', plugin_name, config_file.name)):
                         continue
                     
-                    # Flatten config and store in cache
-                    self._process_config_dict(
+                    leaves = self._load_yaml_leaves(config_file.path)
+                    self._mark_scanned(instance_id, rel_path, st)
+                    
+                    # Store flattened config in cache
+                    self._queue_config_leaves(
                         instance_id, server_name, 'plugin',
-                        plugin_name, config_file.name, config_data
+                        plugin_name, config_file.name, leaves
                     )
                 
                 except Exception as e:
-                    logger.warning(f"Failed to read {config_file}: {e}")
+                    logger.warning(f"Failed to read {config_file.path}: {e}")
     
     def _scan_standard_configs(self, instance_id: str, server_name: str, minecraft_dir: Path):
         """Scan standard Minecraft server configs"""
@@ -121,21 +427,25 @@ class ConfigCachePopulator:
         
         for filename in standard_files:
             config_file = minecraft_dir / filename
-            if not config_file.exists():
+            try:
+                st = config_file.stat()
+            except FileNotFoundError:
                 continue
             
             try:
+                if self._file_unchanged(filename, st, ('standard', None, filename)):
+                    continue
+                
                 if filename.endswith('.properties'):
-                    config_data = self._parse_properties_file(config_file)
+                    leaves = self._flatten_config(self._parse_properties_file(config_file))
                 else:
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        config_data = yaml.safe_load(f)
+                    leaves = self._load_yaml_leaves(config_file)
+                self._mark_scanned(instance_id, filename, st)
                 
-                if config_data:
-                    self._process_config_dict(
-                        instance_id, server_name, 'standard',
-                        None, filename, config_data
-                    )
+                self._queue_config_leaves(
+                    instance_id, server_name, 'standard',
+                    None, filename, leaves
+                )
             
             except Exception as e:
                 logger.warning(f"Failed to read {config_file}: {e}")
@@ -143,77 +453,122 @@ class ConfigCachePopulator:
     def _scan_datapacks(self, instance_id: str, server_name: str, datapacks_dir: Path):
         """Scan installed datapacks"""
         
-        for datapack in datapacks_dir.iterdir():
-            if datapack.is_dir() or datapack.suffix == '.zip':
-                datapack_name = datapack.stem
-                
+        with os.scandir(datapacks_dir) as entries:
+            datapacks = list(entries)
+        
+        for datapack in datapacks:
+            datapack_name, extension = os.path.splitext(datapack.name)
+            if extension == '.zip' or datapack.is_dir():
                 # Record datapack presence
-                self._store_cache_entry(
-                    instance_id, server_name, 'datapack',
-                    datapack_name, None, None, 'true', 'boolean'
+                self._queue_cache_entry(
+                    (instance_id, server_name, 'datapack', datapack_name, None),
+                    None, 'true', 'boolean'
                 )
     
+    def _load_yaml_leaves(self, file_path) -> List[tuple]:
+        """
+        Parse and flatten a YAML file, reusing the result for byte-identical files
+        
+        The parsed document is dropped right after flattening; only the leaves are kept.
+        """
+        with open(file_path, 'rb') as f:
+            # mmap rejects empty files, which have no keys anyway
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            
+            # Hash and parse straight from the page cache instead of a read() copy
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                digest = hashlib.blake2b(data, digest_size=16).digest()
+                leaves = self._leaves_cache.get(digest)
+                if leaves is not None:
+                    return leaves
+                
+                if self._parse_pool is None:
+                    leaves = self._flatten_config(yaml.load(data, Loader=SafeLoader))
+                else:
+                    # The worker parses exactly the bytes that were hashed, so a file
+                    # rewritten mid-scan can't cache leaves under the wrong digest
+                    raw = data[:]
+        
+        if leaves is None:
+            leaves = self._parse_pool.submit(_parse_yaml_leaves, raw).result()
+        
+        self._leaves_cache[digest] = leaves
+        return leaves
+    
     def _parse_properties_file(self, file_path: Path) -> dict:
         """Parse Java .properties file"""
+        with open(file_path, 'rb') as f:
+            text = f.read().decode('utf-8')
+        
         config = {}
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        config[key.strip()] = value.strip()
+        for line in text.splitlines():
+            line = line.strip()
+            if line and line[0] != '#':
+                key, sep, value = line.partition('=')
+                if sep:
+                    config[key.strip()] = value.strip()
         return config
     
-    def _process_config_dict(self, instance_id: str, server_name: str, config_type: str,
-                            plugin_name: Optional[str], config_file: str, config_data: dict,
-                            prefix: str = ""):
-        """Process config dictionary recursively"""
+    @staticmethod
+    def _flatten_config(config_data: Optional[dict]) -> List[tuple]:
+        """
+        Flatten a config dictionary, walking nested dicts iteratively
         
-        for key, value in config_data.items():
-            full_key = f"{prefix}{key}" if prefix else key
-            
-            if isinstance(value, dict):
-                # Recurse into nested dicts
-                self._process_config_dict(
-                    instance_id, server_name, config_type,
-                    plugin_name, config_file, value, f"{full_key}."
-                )
-            else:
-                # Store leaf values
-                value_str = str(value) if value is not None else None
-                value_type = self._get_value_type(value)
+        Returns:
+            (dotted key, value_str, value_type) per leaf, in document order
+        """
+        leaves = []
+        if not config_data:
+            return leaves
+        
+        # (key prefix, items iterator) per open dict
+        stack = [("", iter(config_data.items()))]
+        while stack:
+            node_prefix, items = stack[-1]
+            for key, value in items:
+                full_key = f"{node_prefix}{key}" if node_prefix else key
                 
-                self._store_cache_entry(
-                    instance_id, server_name, config_type,
-                    plugin_name, config_file, full_key, value_str, value_type
-                )
+                if isinstance(value, dict):
+                    # Descend into nested dict, resume this one afterwards
+                    stack.append((f"{full_key}.", iter(value.items())))
+                    break
+                
+                leaves.append((
+                    full_key,
+                    str(value) if value is not None else None,
+                    _VALUE_TYPES.get(type(value), 'string')
+                ))
+            else:
+                stack.pop()
+        
+        return leaves
     
-    def _get_value_type(self, value) -> str:
-        """Determine value type"""
-        if value is None:
-            return 'null'
-        elif isinstance(value, bool):
-            return 'boolean'
-        elif isinstance(value, int):
-            return 'integer'
-        elif isinstance(value, float):
-            return 'float'
-        elif isinstance(value, list):
-            return 'list'
-        else:
-            return 'string'
-    
-    def _store_cache_entry(self, instance_id: str, server_name: str, config_type: str,
-                          plugin_name: Optional[str], config_file: Optional[str],
-                          config_key: Optional[str], actual_value: Optional[str],
-                          value_type: str):
-        """Store config entry in variance cache"""
+    def _queue_config_leaves(self, instance_id: str, server_name: str, config_type: str,
+                             plugin_name: Optional[str], config_file: str, leaves: List[tuple]):
+        """Queue flattened config leaves for the variance cache"""
+        
+        # Leading row columns are the same for every key of the file, build them once
+        row_prefix = (instance_id, server_name, config_type, plugin_name, config_file)
+        queue_entry = self._queue_cache_entry
+        
+        for full_key, value_str, value_type in leaves:
+            queue_entry(row_prefix, full_key, value_str, value_type)
+    
+    def _queue_cache_entry(self, row_prefix: tuple, config_key: Optional[str],
+                          actual_value: Optional[str], value_type: str):
+        """
+        Queue config entry for the variance cache
+        
+        Args:
+            row_prefix: (instance_id, server_name, config_type, plugin_name, config_file)
+            config_key: Dotted key path
+            actual_value: Live value as stored
+            value_type: Stored value_type
+        """
         
         # Resolve expected value from rules
-        expected_value, variance_type = self._resolve_expected_value(
-            instance_id, server_name, config_type, plugin_name, config_file, config_key
-        )
+        expected_value, variance_type = self._resolve_expected_value(*row_prefix, config_key)
         
         # Determine if drift (value differs from expected)
         is_drift = False
@@ -221,34 +576,13 @@ class ConfigCachePopulator:
             is_drift = True
             variance_type = 'DRIFT'
         
-        cursor = self.db.conn.cursor()
-        cursor.execute("""
-            INSERT INTO config_variance_cache
-            (instance_id, server_name, config_type, plugin_name, config_file,
-             config_key, actual_value, expected_value, variance_type, value_type,
-             is_drift, last_scanned)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                actual_value = VALUES(actual_value),
-                expected_value = VALUES(expected_value),
-                variance_type = VALUES(variance_type),
-                value_type = VALUES(value_type),
-                is_drift = VALUES(is_drift),
-                last_scanned = VALUES(last_scanned)
-        """, (
-            instance_id, server_name, config_type, plugin_name, config_file,
-            config_key, actual_value, expected_value, variance_type, value_type,
-            is_drift, datetime.now()
+        self._local.pending_rows.append(row_prefix + (
+            config_key, actual_value, expected_value, variance_type, value_type, is_drift
         ))
         
-        self.db.conn.commit()
-        
         # Log drift if detected
         if is_drift:
-            self._log_drift(
-                instance_id, server_name, config_type, plugin_name,
-                config_file, config_key, expected_value, actual_value
-            )
+            self._log_drift(*row_prefix, config_key, expected_value, actual_value)
     
     def _resolve_expected_value(self, instance_id: str, server_name: str, config_type: str,
                                plugin_name: Optional[str], config_file: Optional[str],
@@ -258,30 +592,27 @@ class ConfigCachePopulator:
         
         Returns: (expected_value, variance_type)
         """
-        cursor = self.db.conn.cursor(dictionary=True)
-        
-        # Query rules in priority order
-        cursor.execute("""
-            SELECT expected_value, scope, priority, is_variable
-            FROM config_rules
-            WHERE config_type = %s
-              AND (plugin_name = %s OR plugin_name IS NULL)
-              AND (config_file = %s OR config_file IS NULL)
-              AND (config_key = %s OR config_key IS NULL)
-              AND (
-                  scope = 'GLOBAL'
-                  OR (scope = 'SERVER' AND server_name = %s)
-                  OR (scope = 'INSTANCE' AND instance_id = %s)
-                  OR (scope = 'META_TAG' AND meta_tag_id IN (
-                      SELECT meta_tag_id FROM instance_tags WHERE instance_id = %s
-                  ))
-              )
-            ORDER BY priority ASC
-            LIMIT 1
-        """, (config_type, plugin_name, config_file, config_key,
-              server_name, instance_id, instance_id))
-        
-        rule = cursor.fetchone()
+        tags = self._instance_tags.get(instance_id, ())
+        rule = None
+        
+        # Exact match first, then with each field widened to the NULL wildcard
+        plugins = (plugin_name, None) if plugin_name is not None else (None,)
+        files = (config_file, None) if config_file is not None else (None,)
+        keys = (config_key, None) if config_key is not None else (None,)
+        
+        for plugin in plugins:
+            for file in files:
+                for key in keys:
+                    for candidate in self._rules_index.get((config_type, plugin, file, key), ()):
+                        scope = candidate['scope']
+                        if (scope == 'GLOBAL'
+                                or (scope == 'SERVER' and candidate['server_name'] == server_name)
+                                or (scope == 'INSTANCE' and candidate['instance_id'] == instance_id)
+                                or (scope == 'META_TAG' and candidate['meta_tag_id'] in tags)):
+                            # Buckets are priority ordered, so the first applicable rule wins
+                            if rule is None or candidate['priority'] < rule['priority']:
+                                rule = candidate
+                            break
         
         if not rule:
             return None, 'NONE'
@@ -309,56 +640,141 @@ class ConfigCachePopulator:
     def _substitute_variables(self, instance_id: str, value: str) -> str:
         """Substitute {{VARIABLE}} placeholders"""
         
-        cursor = self.db.conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT variable_name, variable_value
-            FROM config_variables
-            WHERE instance_id = %s
-        """, (instance_id,))
-        
-        variables = {row['variable_name']: row['variable_value'] for row in cursor.fetchall()}
-        
-        # Also get instance-specific values from instances table
-        cursor.execute("""
-            SELECT instance_id, server_name, instance_type
-            FROM instances
-            WHERE instance_id = %s
-        """, (instance_id,))
-        
-        inst = cursor.fetchone()
-        if inst:
-            variables['INSTANCE_ID'] = inst['instance_id']
-            variables['SERVER_NAME'] = inst['server_name']
-            variables['SHORTNAME'] = inst['instance_id']  # e.g., BENT01
+        variables = self._instance_variables.get(instance_id, {})
         
-        # Substitute
-        result = value
-        for var_name, var_value in variables.items():
-            result = result.replace(f"{{{{{var_name}}}}}", str(var_value))
+        # Substitute in one pass; unknown placeholders are left as they are
+        def replace(match):
+            name = match.group(1)
+            return str(variables[name]) if name in variables else match.group(0)
         
-        return result
+        return _VARIABLE_RE.sub(replace, value)
     
     def _log_drift(self, instance_id: str, server_name: str, config_type: str,
                    plugin_name: Optional[str], config_file: Optional[str],
                    config_key: Optional[str], expected_value: str, actual_value: str):
-        """Log detected drift"""
+        """Queue detected drift for config_drift_log"""
         
-        cursor = self.db.conn.cursor()
-        cursor.execute("""
-            INSERT INTO config_drift_log
-            (instance_id, server_name, config_type, plugin_name, config_file,
-             config_key, expected_value, actual_value, severity, detected_at, status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
+        self._local.pending_drift.append((
             instance_id, server_name, config_type, plugin_name, config_file,
-            config_key, expected_value, actual_value, 'MEDIUM', datetime.now(), 'PENDING'
+            config_key, expected_value, actual_value, 'MEDIUM', 'PENDING'
         ))
-        
-        self.db.conn.commit()
         logger.warning(
             f"DRIFT: {instance_id}/{config_type}/{plugin_name or 'standard'}/{config_file}:"
             f"{config_key} = {actual_value} (expected {expected_value})"
         )
+    
+    def _flush_pending(self):
+        """Write queued cache and drift rows and commit once per instance"""
+        
+        db = self._dbs.get()
+        drift = self._local.pending_drift
+        meta = self._local.pending_meta
+        
+        # Rows identical to what is already cached only need last_scanned bumped
+        cached = self._local.cached_rows
+        scanned = self._local.pending_rows
+        rows = []
+        touched = []
+        for row in scanned:
+            entry = cached.get(row[2:6])
+            if entry is not None and entry[1] == (row[1],) + row[6:]:
+                touched.append(entry[0])
+            else:
+                rows.append(row)
+        
+        # Rows of files skipped as unchanged were seen too; keys that no longer
+        # exist keep their old last_scanned so stale entries stay visible
+        skipped = self._local.skipped_file_keys
+        if skipped:
+            touched.extend(cache_id for key, (cache_id, _) in cached.items() if key[:3] in skipped)
+        
+        # Write in key order so concurrent instance transactions take locks in
+        # the same order; NULL plugin/file/key columns sort first
+        touched.sort()
+        rows.sort(key=_row_sort_key)
+        drift = sorted(drift, key=_row_sort_key)
+        meta = sorted(meta, key=lambda row: row[1])
+        
+        retry_on_lock_conflict(
+            lambda: self._write_pending(db, rows, touched, drift, meta),
+            self.WRITE_ATTEMPTS, f"writing {self._local.instance_id}"
+        )
+        
+        logger.info(f"Cached {len(rows)} changed of {len(scanned)} keys, {len(drift)} drifted, "
+                    f"{self._local.skipped_files} unchanged files skipped")
+    
+    def _write_pending(self, db: ConfigDatabase, rows: List[tuple], touched: List[int],
+                       drift: List[tuple], meta: List[tuple]):
+        """Write one instance's cache, drift and file meta rows in a single transaction"""
+        try:
+            cursor = db.conn.cursor()
+            for i in range(0, len(touched), self.INSERT_BATCH_SIZE):
+                batch = touched[i:i + self.INSERT_BATCH_SIZE]
+                cursor.execute(self.CACHE_TOUCH_SQL.format(ids=', '.join(['%s'] * len(batch))), batch)
+            
+            if self.bulk:
+                if rows:
+                    self._bulk_load_rows(db, rows)
+            else:
+                self._insert_rows(db, rows)
+            
+            if drift:
+                cursor.executemany(self.DRIFT_INSERT_SQL, drift)
+            if meta:
+                cursor.executemany(self.FILE_META_SQL, meta)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    
+    def _insert_rows(self, db: ConfigDatabase, rows: List[tuple]):
+        """Upsert cache rows with multi-row INSERTs"""
+        
+        # Full batches reuse one server-side prepared statement; mysql-connector's
+        # prepared executemany would send one execute per row instead
+        full = len(rows) - len(rows) % self.INSERT_BATCH_SIZE
+        if full:
+            insert_cursor = self._insert_cursor()
+            for i in range(0, full, self.INSERT_BATCH_SIZE):
+                batch = rows[i:i + self.INSERT_BATCH_SIZE]
+                insert_cursor.execute(self._batch_insert_sql, [value for row in batch for value in row])
+        
+        if full < len(rows):
+            cursor = db.conn.cursor()
+            cursor.executemany(self.CACHE_INSERT_SQL.format(values=self.CACHE_ROW), rows[full:])
+    
+    def _bulk_load_rows(self, db: ConfigDatabase, rows: List[tuple]):
+        """Load cache rows through LOAD DATA LOCAL INFILE and merge them in one INSERT ... SELECT"""
+        
+        cursor = db.conn.cursor()
+        cursor.execute(self.STAGING_CREATE_SQL)
+        cursor.execute("DELETE FROM config_variance_cache_staging")
+        
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='', suffix='.tsv') as f:
+            f.writelines('\t'.join(map(_tsv_field, row)) + '\n' for row in rows)
+            f.flush()
+            cursor.execute(self.BULK_LOAD_SQL, (f.name,))
+        
+        cursor.execute(self.BULK_MERGE_SQL)
+
+
+def _row_sort_key(row: tuple) -> tuple:
+    """Order cache/drift rows by (config_type, plugin_name, config_file, config_key)"""
+    return tuple('' if value is None else value for value in row[2:6])
+
+
+def _parse_yaml_leaves(raw: bytes) -> List[tuple]:
+    """Process pool worker for _load_yaml_leaves"""
+    return ConfigCachePopulator._flatten_config(yaml.load(raw, Loader=SafeLoader))
+
+
+def _tsv_field(value) -> str:
+    """Format one value for LOAD DATA (\\N is NULL)"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return str(value).translate(_TSV_ESCAPES)
 
 
 def main():
@@ -368,6 +784,14 @@ def main():
     parser = argparse.ArgumentParser(description='Populate config variance cache')
     parser.add_argument('--amp-dir', default='/home/amp/.ampdata/instances',
                        help='AMP instances directory')
+    parser.add_argument('--workers', type=int, default=ConfigCachePopulator.MAX_WORKERS,
+                       help='Instances to scan concurrently')
+    parser.add_argument('--full-rescan', action='store_true',
+                       help='Re-read files that are unchanged since the last scan')
+    parser.add_argument('--bulk', action='store_true',
+                       help='Load cache rows with LOAD DATA LOCAL INFILE (faster for full refreshes)')
+    parser.add_argument('--parse-processes', type=int, default=None,
+                       help='YAML parse worker processes (default: CPU count, 0 parses in-thread)')
     
     args = parser.parse_args()
     
@@ -377,12 +801,15 @@ def main():
         port=settings.DB_PORT,
         user=settings.DB_USER,
         password=settings.DB_PASSWORD,
-        database=settings.DB_NAME
+        database=settings.DB_NAME,
+        allow_local_infile=args.bulk
     )
     db.connect()
     
     try:
-        populator = ConfigCachePopulator(db, Path(args.amp_dir))
+        populator = ConfigCachePopulator(db, Path(args.amp_dir), workers=args.workers,
+                                         full_rescan=args.full_rescan, bulk=args.bulk,
+                                         parse_processes=args.parse_processes)
         populator.populate_all_instances()
         logger.info("Config cache population complete")
     finally:
@@ -9,20 +9,29 @@ Scans live instances and populates plugin metadata tables:
 - instance_server_properties (server.properties values)
 """
 
+import io
+import os
+import mmap
 import sys
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
+from dataclasses import dataclass
 from datetime import datetime
 import logging
 import yaml
-import json
 import hashlib
 import re
+import zipfile
+from typing import Any, Optional, Tuple, List, Dict
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
-from database.db_access import ConfigDatabase
+from database.db_access import ConfigDatabase, ThreadLocalDatabases, retry_on_lock_conflict
 from core.settings import settings
+from utils.serde import SafeLoader, json_loads, json_dumps
 from amp_integration.instance_scanner import AMPInstanceScanner
 
 logging.basicConfig(
@@ -31,337 +40,616 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Source discovery patterns, shared by plugin websites and datapack descriptions
+_GITHUB_RE = re.compile(r'github\.com/([^/\s]+/[^/\s]+)')
+_MODRINTH_RE = re.compile(r'modrinth\.com/(?:mod|plugin|datapack)/([^/\s]+)')
+_HANGAR_RE = re.compile(r'hangar\.papermc\.io/([^/\s]+)')
+_SPIGOT_RE = re.compile(r'spigotmc\.org/resources/[^.]+\.(\d+)')
+_CURSE_RE = re.compile(r'/projects/([^/\s]+)')
+_PLUGIN_ID_STRIP = re.compile(r'[^a-z0-9_-]')
+
+
+@dataclass
+class PluginMeta:
+    """The plugin.yml / fabric.mod.json fields the populator stores, normalized once"""
+    name: str = 'Unknown'
+    version: str = '1.0.0'
+    main: str = ''
+    author: str = ''
+    description: str = ''
+    website: str = ''
+    license: str = ''
+    
+    @classmethod
+    def from_plugin_yml(cls, data: Any) -> Optional['PluginMeta']:
+        """Build from a parsed plugin.yml; None if it isn't a mapping"""
+        if not isinstance(data, dict):
+            return None
+        return cls(
+            name=_text(data.get('name'), cls.name),
+            version=_text(data.get('version'), cls.version),
+            main=_text(data.get('main'), ''),
+            author=_join_names(data.get('author', data.get('authors'))),
+            description=_text(data.get('description'), ''),
+            website=_text(data.get('website'), ''),
+            license=_text(data.get('license'), '')
+        )
+    
+    @classmethod
+    def from_fabric_mod_json(cls, data: Any) -> Optional['PluginMeta']:
+        """Build from a parsed fabric.mod.json; None if it isn't an object"""
+        if not isinstance(data, dict):
+            return None
+        
+        main = (data.get('entrypoints') or {}).get('main') or ['']
+        main = main[0] if isinstance(main, list) and main else main
+        if isinstance(main, dict):
+            main = main.get('value', '')  # {"adapter": ..., "value": "com.example.Mod"}
+        
+        return cls(
+            name=_text(data.get('name', data.get('id')), cls.name),
+            version=_text(data.get('version'), cls.version),
+            main=_text(main, ''),
+            author=_join_names(data.get('authors')),
+            description=_text(data.get('description'), ''),
+            website=_text((data.get('contact') or {}).get('homepage'), ''),
+            license=_join_names(data.get('license'))
+        )
+
+
+def _text(value: Any, default: str) -> str:
+    """String form of a metadata field, or default if it's missing"""
+    return default if value is None else str(value)
+
+
+def _join_names(value: Any) -> str:
+    """Flatten an author(s) or license field (string, list, or Fabric person objects)"""
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ', '.join(
+            str(person.get('name', '')) if isinstance(person, dict) else str(person)
+            for person in value
+        )
+    return str(value)
+
 
 class PluginMetadataPopulator:
     """Populates plugin metadata from live instances"""
     
-    def __init__(self, db: ConfigDatabase, amp_base_dir: Path):
+    # Instances scanned concurrently; each worker thread holds its own connection
+    MAX_WORKERS = min(8, os.cpu_count() or 1)
+    
+    # Attempts per instance transaction when it loses a lock conflict
+    WRITE_ATTEMPTS = 4
+    
+    PLUGIN_UPSERT_SQL = """
+        INSERT INTO plugins 
+        (plugin_id, plugin_name, platform, current_version, 
+         github_repo, modrinth_id, hangar_slug, spigot_id, bukkit_id, curseforge_id,
+         docs_url, wiki_url, plugin_page_url,
+         has_cicd, cicd_provider, cicd_url,
+         description, author, license,
+         last_checked_at, last_updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            current_version = VALUES(current_version),
+            github_repo = COALESCE(VALUES(github_repo), github_repo),
+            modrinth_id = COALESCE(VALUES(modrinth_id), modrinth_id),
+            hangar_slug = COALESCE(VALUES(hangar_slug), hangar_slug),
+            docs_url = COALESCE(VALUES(docs_url), docs_url),
+            wiki_url = COALESCE(VALUES(wiki_url), wiki_url),
+            last_checked_at = VALUES(last_checked_at)
+    """
+    
+    INSTANCE_PLUGIN_UPSERT_SQL = """
+        INSERT INTO instance_plugins
+        (instance_id, plugin_id, installed_version, file_name, file_hash, is_enabled, installed_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            installed_version = VALUES(installed_version),
+            file_name = VALUES(file_name),
+            file_hash = VALUES(file_hash),
+            last_checked_at = NOW()
+    """
+    
+    DATAPACK_UPSERT_SQL = """
+        INSERT INTO instance_datapacks
+        (instance_id, datapack_name, world_name, file_name, file_hash,
+         modrinth_id, github_repo, custom_source, is_enabled, installed_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            file_name = VALUES(file_name),
+            file_hash = VALUES(file_hash),
+            last_checked_at = NOW()
+    """
+    
+    SERVER_PROPERTIES_UPSERT_SQL = """
+        INSERT INTO instance_server_properties
+        (instance_id, level_name, gamemode, difficulty, max_players,
+         view_distance, simulation_distance, pvp, spawn_protection,
+         properties_json, last_updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            level_name = VALUES(level_name),
+            gamemode = VALUES(gamemode),
+            difficulty = VALUES(difficulty),
+            max_players = VALUES(max_players),
+            view_distance = VALUES(view_distance),
+            simulation_distance = VALUES(simulation_distance),
+            pvp = VALUES(pvp),
+            spawn_protection = VALUES(spawn_protection),
+            properties_json = VALUES(properties_json),
+            last_updated_at = VALUES(last_updated_at)
+    """
+    
+    FINGERPRINT_UPSERT_SQL = """
+        INSERT INTO plugin_file_fingerprints
+        (instance_id, file_name, mtime_ns, file_size, file_hash, plugin_id, installed_version, last_scanned)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+            mtime_ns = VALUES(mtime_ns),
+            file_size = VALUES(file_size),
+            file_hash = VALUES(file_hash),
+            plugin_id = VALUES(plugin_id),
+            installed_version = VALUES(installed_version),
+            last_scanned = VALUES(last_scanned)
+    """
+    
+    # Plugins whose JAR was skipped as unchanged; the JAR's values still hold
+    PLUGIN_TOUCH_SQL = """
+        UPDATE plugins SET current_version = %s, last_checked_at = %s
+        WHERE plugin_id = %s
+    """
+    
+    FINGERPRINT_DELETE_SQL = """
+        DELETE FROM plugin_file_fingerprints WHERE instance_id = %s AND file_name = %s
+    """
+    
+    def __init__(self, db: ConfigDatabase, amp_base_dir: Path, workers: int = MAX_WORKERS,
+                 jar_processes: Optional[int] = None, full_rescan: bool = False):
         self.db = db
         self.amp_base_dir = amp_base_dir
         self.scanner = AMPInstanceScanner(amp_base_dir)
+        self.workers = workers
+        # Re-read every JAR even if plugin_file_fingerprints says it is unchanged
+        self.full_rescan = full_rescan
+        # JAR inflate + YAML parse is CPU-bound and holds the GIL, so it runs in
+        # worker processes; 0 extracts in this process
+        self.jar_processes = (os.cpu_count() or 1) if jar_processes is None else jar_processes
+        self._jar_pool: Optional[ProcessPoolExecutor] = None
+        # Timestamp written for every row of a run; reset by populate_all
+        self._run_ts = datetime.now()
+        
+        # Per-thread scan state and connections (worker threads open their own)
+        self._local = threading.local()
+        self._dbs = ThreadLocalDatabases(db)
     
     def populate_all(self):
         """Populate all metadata tables"""
         logger.info("Starting plugin metadata population...")
         
         instances = self.scanner.discover_instances()
-        logger.info(f"Found {len(instances)} instances")
+        logger.info(f"Found {len(instances)} instances to scan with {self.workers} workers")
         
-        for instance in instances:
-            try:
-                self.populate_instance(instance)
-            except Exception as e:
-                logger.error(f"Failed to process {instance['name']}: {e}", exc_info=True)
+        self._run_ts = datetime.now()
+        
+        if self.jar_processes > 0:
+            self._jar_pool = ProcessPoolExecutor(
+                max_workers=self.jar_processes,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(self._populate_instance_logged, instances))
+        finally:
+            if self._jar_pool is not None:
+                self._jar_pool.shutdown()
+                self._jar_pool = None
+            self._dbs.close_workers()
         
         logger.info("Plugin metadata population complete")
     
+    def _populate_instance_logged(self, instance: dict):
+        """Populate one instance, logging instead of raising on failure"""
+        try:
+            self.populate_instance(instance)
+        except Exception as e:
+            logger.error(f"Failed to process {instance['name']}: {e}", exc_info=True)
+    
     def populate_instance(self, instance: dict):
-        """Populate metadata for a single instance"""
+        """Populate metadata for a single instance
+        
+        Rows are collected for the whole instance and written with one
+        executemany per table, followed by a single commit. JARs whose
+        (mtime, size) match their stored fingerprint are not re-read.
+        """
         instance_id = instance['name']
         logger.info(f"Processing {instance_id}...")
         
         instance_path = Path(instance['path'])
         minecraft_dir = instance_path / 'Minecraft'
         
-        if not minecraft_dir.exists():
+        if not os.path.isdir(minecraft_dir):
             logger.warning(f"Minecraft directory not found for {instance_id}")
             return
         
+        db = self._dbs.get()
+        self._local.fingerprints = {} if self.full_rescan else self._load_fingerprints(db, instance_id)
+        self._local.pending_fingerprints = []
+        self._local.touched_plugins = []
+        self._local.skipped_jars = 0
+        
+        # Each scanner treats a missing directory/file as empty, so no
+        # separate exists() stat is needed
+        
         # 1. Scan plugins
-        plugins_dir = minecraft_dir / 'plugins'
-        if plugins_dir.exists():
-            self._scan_plugins(instance_id, plugins_dir)
+        plugin_rows, instance_plugin_rows = self._scan_plugins(instance_id, minecraft_dir / 'plugins')
         
         # 2. Scan datapacks
-        datapacks_dir = minecraft_dir / 'world' / 'datapacks'
-        if datapacks_dir.exists():
-            self._scan_datapacks(instance_id, datapacks_dir)
+        datapack_rows = self._scan_datapacks(instance_id, minecraft_dir / 'world' / 'datapacks')
         
         # 3. Scan server properties
-        server_props = minecraft_dir / 'server.properties'
-        if server_props.exists():
-            self._scan_server_properties(instance_id, server_props)
-    
-    def _scan_plugins(self, instance_id: str, plugins_dir: Path):
-        """Scan and register plugins"""
-        for item in plugins_dir.iterdir():
-            # Check for JAR files
-            if item.is_file() and item.suffix == '.jar':
-                self._process_plugin_jar(instance_id, item)
-            
-            # Check for plugin folders with plugin.yml
-            elif item.is_dir():
-                plugin_yml = item / 'plugin.yml'
-                if plugin_yml.exists():
-                    self._process_plugin_folder(instance_id, item, plugin_yml)
+        properties_row = self._scan_server_properties(instance_id, minecraft_dir / 'server.properties')
+        
+        # Fingerprints not claimed by a JAR during the scan belong to removed JARs
+        stale_fingerprints = [(instance_id, file_name) for file_name in self._local.fingerprints]
+        
+        if plugin_rows:
+            # plugins rows are shared across instances; upserting in key order
+            # keeps concurrent workers from deadlocking on each other's locks
+            plugin_rows.sort(key=lambda row: row[0])
+        touched_plugins = sorted(self._local.touched_plugins, key=lambda row: row[2])
+        
+        # Gap locks can still deadlock concurrent upserts; replay the transaction
+        retry_on_lock_conflict(
+            lambda: self._write_instance(db, plugin_rows, touched_plugins, instance_plugin_rows,
+                                         stale_fingerprints, datapack_rows, properties_row),
+            self.WRITE_ATTEMPTS, f"writing {instance_id}"
+        )
+        
+        logger.info(
+            f"Registered {len(instance_plugin_rows)} plugins ({self._local.skipped_jars} unchanged JARs "
+            f"skipped), {len(datapack_rows)} datapacks"
+            f"{' and server properties' if properties_row else ''} on {instance_id}"
+        )
+    
+    def _write_instance(self, db: ConfigDatabase, plugin_rows: List[tuple], touched_plugins: List[tuple],
+                        instance_plugin_rows: List[tuple], stale_fingerprints: List[tuple],
+                        datapack_rows: List[tuple], properties_row: Optional[tuple]):
+        """Write one instance's rows in a single transaction, rolling back on error"""
+        cursor = db.conn.cursor()
+        try:
+            if plugin_rows:
+                cursor.executemany(self.PLUGIN_UPSERT_SQL, plugin_rows)
+            if touched_plugins:
+                cursor.executemany(self.PLUGIN_TOUCH_SQL, touched_plugins)
+            if instance_plugin_rows:
+                cursor.executemany(self.INSTANCE_PLUGIN_UPSERT_SQL, instance_plugin_rows)
+            # Fingerprints commit with the rows they describe, so a failed write
+            # leaves the JARs to be re-read next run
+            if self._local.pending_fingerprints:
+                cursor.executemany(self.FINGERPRINT_UPSERT_SQL, self._local.pending_fingerprints)
+            if stale_fingerprints:
+                cursor.executemany(self.FINGERPRINT_DELETE_SQL, stale_fingerprints)
+            if datapack_rows:
+                cursor.executemany(self.DATAPACK_UPSERT_SQL, datapack_rows)
+            if properties_row:
+                cursor.execute(self.SERVER_PROPERTIES_UPSERT_SQL, properties_row)
+            db.conn.commit()
+        except Exception:
+            db.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    
+    def _load_fingerprints(self, db: ConfigDatabase, instance_id: str) -> Dict[str, tuple]:
+        """
+        Get the instance's JAR fingerprints from the last scan
+        
+        Returns:
+            file_name -> (mtime_ns, file_size, file_hash, plugin_id, installed_version, plugin_exists)
+        """
+        cursor = db.conn.cursor()
+        cursor.execute("""
+            SELECT f.file_name, f.mtime_ns, f.file_size, f.file_hash, f.plugin_id,
+                   f.installed_version, p.plugin_id IS NOT NULL
+            FROM plugin_file_fingerprints f
+            LEFT JOIN plugins p ON p.plugin_id = f.plugin_id
+            WHERE f.instance_id = %s
+        """, (instance_id,))
+        return {row[0]: tuple(row[1:6]) + (bool(row[6]),) for row in cursor.fetchall()}
     
-    def _process_plugin_jar(self, instance_id: str, jar_file: Path):
-        """Process a plugin JAR file"""
-        import zipfile
+    def _scan_plugins(self, instance_id: str, plugins_dir: Path) -> Tuple[List[tuple], List[tuple]]:
+        """Scan plugins and build their plugins / instance_plugins rows"""
+        plugin_rows = []
+        instance_plugin_rows = []
+        jar_files = []
+        jar_stats = []
+        fingerprints = self._local.fingerprints
         
         try:
-            with zipfile.ZipFile(jar_file, 'r') as zf:
-                # Try to read plugin.yml
-                try:
-                    plugin_yml_data = zf.read('plugin.yml').decode('utf-8')
-                    plugin_info = yaml.safe_load(plugin_yml_data)
-                except:
-                    # Try fabric.mod.json
-                    try:
-                        fabric_json_data = zf.read('fabric.mod.json').decode('utf-8')
-                        plugin_info = json.loads(fabric_json_data)
-                        plugin_info = self._normalize_fabric_metadata(plugin_info)
-                    except:
-                        # Unknown plugin format
-                        logger.warning(f"Could not read metadata from {jar_file.name}")
-                        return
-                
-                self._register_plugin(instance_id, plugin_info, jar_file)
+            # DirEntry caches the file type from the directory read, so
+            # is_file()/is_dir() don't stat each entry
+            with os.scandir(plugins_dir) as entries:
+                for entry in entries:
+                    # Collect changed JAR files for extraction below
+                    if entry.name.endswith('.jar') and entry.is_file():
+                        st = entry.stat()
+                        fingerprint = fingerprints.pop(entry.name, None)
+                        # Unchanged since the last scan; a deleted plugins row forces a
+                        # re-extract, since instance_plugins references it
+                        if (fingerprint is not None and fingerprint[5]
+                                and fingerprint[:2] == (st.st_mtime_ns, st.st_size)):
+                            file_hash, plugin_id, version = fingerprint[2:5]
+                            instance_plugin_rows.append(
+                                (instance_id, plugin_id, version, entry.name, file_hash, True, self._run_ts)
+                            )
+                            self._local.touched_plugins.append((version, self._run_ts, plugin_id))
+                            self._local.skipped_jars += 1
+                            continue
+                        
+                        jar_files.append(Path(entry.path))
+                        jar_stats.append(st)
+                    
+                    # Check for plugin folders with plugin.yml
+                    elif entry.is_dir():
+                        plugin_yml = os.path.join(entry.path, 'plugin.yml')
+                        if os.path.exists(plugin_yml):
+                            rows = self._process_plugin_folder(instance_id, Path(entry.path), Path(plugin_yml))
+                            if rows:
+                                plugin_rows.append(rows[0])
+                                instance_plugin_rows.append(rows[1])
+        except FileNotFoundError:
+            return plugin_rows, instance_plugin_rows
         
-        except Exception as e:
-            logger.warning(f"Failed to process JAR {jar_file.name}: {e}")
+        if self._jar_pool is not None:
+            results = self._jar_pool.map(extract_jar_metadata, jar_files, chunksize=8)
+        else:
+            results = map(extract_jar_metadata, jar_files)
+        
+        for jar_file, st, (plugin_info, file_hash) in zip(jar_files, jar_stats, results):
+            if plugin_info is None:
+                continue
+            plugin_row, instance_plugin_row = self._register_plugin(
+                instance_id, plugin_info, jar_file, file_hash
+            )
+            plugin_rows.append(plugin_row)
+            instance_plugin_rows.append(instance_plugin_row)
+            self._local.pending_fingerprints.append((
+                instance_id, jar_file.name, st.st_mtime_ns, st.st_size, file_hash,
+                instance_plugin_row[1], instance_plugin_row[2]
+            ))
+        
+        return plugin_rows, instance_plugin_rows
     
-    def _process_plugin_folder(self, instance_id: str, folder: Path, plugin_yml: Path):
-        """Process an unpacked plugin folder"""
+    def _process_plugin_folder(self, instance_id: str, folder: Path, plugin_yml: Path) -> Optional[Tuple[tuple, tuple]]:
+        """Process an unpacked plugin folder
+        
+        Returns:
+            (plugin_row, instance_plugin_row), or None if unreadable
+        """
         try:
-            with open(plugin_yml, 'r', encoding='utf-8') as f:
-                plugin_info = yaml.safe_load(f)
+            with open(plugin_yml, 'rb') as f:
+                plugin_info = PluginMeta.from_plugin_yml(yaml.load(f, Loader=SafeLoader))
+            
+            if plugin_info is None:
+                logger.warning(f"Could not read metadata from {folder.name}")
+                return None
             
-            self._register_plugin(instance_id, plugin_info, folder)
+            return self._register_plugin(instance_id, plugin_info, folder)
         
         except Exception as e:
             logger.warning(f"Failed to process plugin folder {folder.name}: {e}")
+            return None
     
-    def _normalize_fabric_metadata(self, fabric_data: dict) -> dict:
-        """Convert Fabric mod metadata to plugin.yml format"""
-        return {
-            'name': fabric_data.get('name', fabric_data.get('id', 'Unknown')),
-            'version': fabric_data.get('version', '1.0.0'),
-            'main': fabric_data.get('entrypoints', {}).get('main', [''])[0],
-            'authors': fabric_data.get('authors', []),
-            'description': fabric_data.get('description', ''),
-            'website': fabric_data.get('contact', {}).get('homepage', '')
-        }
-    
-    def _register_plugin(self, instance_id: str, plugin_info: dict, file_path: Path):
-        """Register plugin in database"""
-        plugin_name = plugin_info.get('name', 'Unknown')
-        version = plugin_info.get('version', '1.0.0')
+    def _register_plugin(self, instance_id: str, plugin_info: PluginMeta, file_path: Path,
+                         file_hash: Optional[str] = None) -> Tuple[tuple, tuple]:
+        """Build the plugins and instance_plugins rows for a plugin
+        
+        Args:
+            instance_id: Instance the plugin is installed on
+            plugin_info: Normalized plugin.yml / fabric.mod.json fields
+            file_path: Plugin JAR or unpacked plugin folder
+            file_hash: SHA256 of the JAR, already computed by extract_jar_metadata
+        
+        Returns:
+            (plugin_row, instance_plugin_row), written later by populate_instance
+        """
+        plugin_name = plugin_info.name
+        version = plugin_info.version
         
         # Normalize plugin ID
         plugin_id = self._normalize_plugin_id(plugin_name)
         
-        # Calculate file hash
-        file_hash = self._calculate_hash(file_path) if file_path.is_file() else None
-        
         # Detect platform
         platform = self._detect_platform(plugin_info)
         
         # Try to find source repositories
         sources = self._discover_sources(plugin_name, plugin_info)
         
-        # Insert/update plugin registry
-        cursor = self.db.conn.cursor()
-        cursor.execute("""
-            INSERT INTO plugins 
-            (plugin_id, plugin_name, platform, current_version, 
-             github_repo, modrinth_id, hangar_slug, spigot_id, bukkit_id, curseforge_id,
-             docs_url, wiki_url, plugin_page_url,
-             has_cicd, cicd_provider, cicd_url,
-             description, author, license,
-             last_checked_at, last_updated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                current_version = VALUES(current_version),
-                github_repo = COALESCE(VALUES(github_repo), github_repo),
-                modrinth_id = COALESCE(VALUES(modrinth_id), modrinth_id),
-                hangar_slug = COALESCE(VALUES(hangar_slug), hangar_slug),
-                docs_url = COALESCE(VALUES(docs_url), docs_url),
-                wiki_url = COALESCE(VALUES(wiki_url), wiki_url),
-                last_checked_at = VALUES(last_checked_at)
-        """, (
+        plugin_row = (
             plugin_id, plugin_name, platform, version,
             sources.get('github_repo'), sources.get('modrinth_id'), sources.get('hangar_slug'),
             sources.get('spigot_id'), sources.get('bukkit_id'), sources.get('curseforge_id'),
             sources.get('docs_url'), sources.get('wiki_url'), sources.get('plugin_page_url'),
             sources.get('has_cicd', False), sources.get('cicd_provider', 'none'), sources.get('cicd_url'),
-            plugin_info.get('description', ''), self._get_author(plugin_info), plugin_info.get('license', ''),
-            datetime.now(), datetime.now()
-        ))
+            plugin_info.description, plugin_info.author, plugin_info.license,
+            self._run_ts, self._run_ts
+        )
+        instance_plugin_row = (
+            instance_id, plugin_id, version, file_path.name, file_hash, True, self._run_ts
+        )
         
-        # Insert/update instance_plugins
-        cursor.execute("""
-            INSERT INTO instance_plugins
-            (instance_id, plugin_id, installed_version, file_name, file_hash, is_enabled, installed_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                installed_version = VALUES(installed_version),
-                file_name = VALUES(file_name),
-                file_hash = VALUES(file_hash),
-                last_checked_at = NOW()
-        """, (
-            instance_id, plugin_id, version, file_path.name, file_hash, True, datetime.now()
-        ))
-        
-        self.db.conn.commit()
-        logger.info(f"Registered: {plugin_name} v{version} on {instance_id}")
+        logger.debug(f"Found: {plugin_name} v{version} on {instance_id}")
+        return plugin_row, instance_plugin_row
     
     def _normalize_plugin_id(self, plugin_name: str) -> str:
         """Create normalized plugin ID"""
-        return re.sub(r'[^a-z0-9_-]', '', plugin_name.lower().replace(' ', '-'))
+        return _PLUGIN_ID_STRIP.sub('', plugin_name.lower().replace(' ', '-'))
     
-    def _calculate_hash(self, file_path: Path) -> str:
-        """Calculate SHA256 hash of file"""
-        sha256 = hashlib.sha256()
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(8192), b''):
-                sha256.update(chunk)
-        return sha256.hexdigest()
-    
-    def _detect_platform(self, plugin_info: dict) -> str:
+    def _detect_platform(self, plugin_info: PluginMeta) -> str:
         """Detect plugin platform"""
-        if 'main' in plugin_info:
-            main_class = plugin_info.get('main', '')
-            if 'fabric' in main_class.lower():
-                return 'fabric'
-            elif 'neoforge' in main_class.lower() or 'forge' in main_class.lower():
-                return 'neoforge'
-            else:
-                return 'paper'  # Default to Paper/Spigot
-        return 'paper'
-    
-    def _get_author(self, plugin_info: dict) -> str:
-        """Extract author from plugin info"""
-        author = plugin_info.get('author', plugin_info.get('authors', ''))
-        if isinstance(author, list):
-            return ', '.join(author)
-        return str(author)
-    
-    def _discover_sources(self, plugin_name: str, plugin_info: dict) -> dict:
+        main_class = plugin_info.main.lower()
+        if 'fabric' in main_class:
+            return 'fabric'
+        elif 'forge' in main_class:  # also matches neoforge
+            return 'neoforge'
+        return 'paper'  # Default to Paper/Spigot
+    
+    def _discover_sources(self, plugin_name: str, plugin_info: PluginMeta) -> dict:
         """Discover source repositories and documentation"""
         sources = {}
         
-        # Check website field for common patterns
-        website = plugin_info.get('website', '')
+        # Check website field for common patterns; it names one host, so at
+        # most one branch below needs to run
+        website = plugin_info.website
+        if not website:
+            return sources
         
-        if 'github.com' in website:
-            # Extract GitHub repo
-            match = re.search(r'github\.com/([^/]+/[^/]+)', website)
-            if match:
-                sources['github_repo'] = match.group(1)
+        sources['plugin_page_url'] = website
+        
+        if 'github.com/' in website:
+            # Extract GitHub repo (owner/name) without a regex walk
+            owner, _, rest = website.partition('github.com/')[2].partition('/')
+            repo_name = rest.split('/', 1)[0].strip()
+            if owner and repo_name:
+                repo = f"{owner}/{repo_name}"
+                sources['github_repo'] = repo
                 sources['has_cicd'] = True
                 sources['cicd_provider'] = 'github'
-                sources['cicd_url'] = f"https://github.com/{match.group(1)}/actions"
+                sources['cicd_url'] = f"https://github.com/{repo}/actions"
+                sources['docs_url'] = f"https://github.com/{repo}/wiki"
+                sources['wiki_url'] = f"https://github.com/{repo}/wiki"
         
-        if 'modrinth.com' in website:
+        elif 'modrinth.com' in website:
             # Extract Modrinth slug
-            match = re.search(r'modrinth\.com/(?:mod|plugin)/([^/]+)', website)
+            match = _MODRINTH_RE.search(website)
             if match:
                 sources['modrinth_id'] = match.group(1)
         
-        if 'hangar.papermc.io' in website:
+        elif 'hangar.papermc.io' in website:
             # Extract Hangar slug
-            match = re.search(r'hangar\.papermc\.io/([^/]+)', website)
+            match = _HANGAR_RE.search(website)
             if match:
                 sources['hangar_slug'] = match.group(1)
         
-        if 'spigotmc.org' in website:
+        elif 'spigotmc.org' in website:
             # Extract Spigot ID
-            match = re.search(r'spigotmc\.org/resources/[^.]+\.(\d+)', website)
+            match = _SPIGOT_RE.search(website)
             if match:
                 sources['spigot_id'] = match.group(1)
         
-        if 'dev.bukkit.org' in website or 'curseforge.com' in website:
+        elif 'dev.bukkit.org' in website or 'curseforge.com' in website:
             # Extract Bukkit/CurseForge ID
-            match = re.search(r'/projects/([^/]+)', website)
+            match = _CURSE_RE.search(website)
             if match:
                 if 'bukkit' in website:
                     sources['bukkit_id'] = match.group(1)
                 else:
                     sources['curseforge_id'] = match.group(1)
         
-        # Documentation URLs
-        if website:
-            sources['plugin_page_url'] = website
-            
-            # Common doc URL patterns
-            if 'github.com' in website:
-                repo = sources.get('github_repo')
-                if repo:
-                    sources['docs_url'] = f"https://github.com/{repo}/wiki"
-                    sources['wiki_url'] = f"https://github.com/{repo}/wiki"
-        
         return sources
     
-    def _scan_datapacks(self, instance_id: str, datapacks_dir: Path):
-        """Scan and register datapacks"""
-        for item in datapacks_dir.iterdir():
-            if item.name == 'vanilla':
-                continue
-            
-            datapack_name = item.stem if item.is_file() else item.name
-            file_hash = self._calculate_hash(item) if item.is_file() else None
-            
-            # Try to detect source
-            sources = self._discover_datapack_sources(datapack_name, item)
-            
-            cursor = self.db.conn.cursor()
-            cursor.execute("""
-                INSERT INTO instance_datapacks
-                (instance_id, datapack_name, world_name, file_name, file_hash,
-                 modrinth_id, github_repo, custom_source, is_enabled, installed_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    file_name = VALUES(file_name),
-                    file_hash = VALUES(file_hash),
-                    last_checked_at = NOW()
-            """, (
-                instance_id, datapack_name, 'world', item.name, file_hash,
-                sources.get('modrinth_id'), sources.get('github_repo'), sources.get('custom_source'),
-                True, datetime.now()
-            ))
-            
-            self.db.conn.commit()
-            logger.info(f"Registered datapack: {datapack_name} on {instance_id}")
+    def _scan_datapacks(self, instance_id: str, datapacks_dir: Path) -> List[tuple]:
+        """Scan datapacks and build their instance_datapacks rows"""
+        rows = []
+        
+        try:
+            with os.scandir(datapacks_dir) as entries:
+                for entry in entries:
+                    if entry.name == 'vanilla':
+                        continue
+                    
+                    if entry.is_file():
+                        datapack_name, ext = os.path.splitext(entry.name)
+                        if ext == '.zip':
+                            file_hash, sources = self._read_zipped_datapack(Path(entry.path))
+                        else:
+                            file_hash = _calculate_hash(entry.path)
+                            sources = {}
+                    else:
+                        datapack_name = entry.name
+                        file_hash = None
+                        # Try to detect source
+                        sources = self._discover_datapack_sources(datapack_name, Path(entry.path))
+                    
+                    rows.append((
+                        instance_id, datapack_name, 'world', entry.name, file_hash,
+                        sources.get('modrinth_id'), sources.get('github_repo'), sources.get('custom_source'),
+                        True, self._run_ts
+                    ))
+                    logger.debug(f"Found datapack: {datapack_name} on {instance_id}")
+        except FileNotFoundError:
+            pass
+        
+        return rows
+    
+    def _read_zipped_datapack(self, zip_path: Path) -> Tuple[str, dict]:
+        """Hash a zipped datapack and read sources from its pack.mcmeta in one read
+        
+        Returns:
+            (file_hash, sources)
+        """
+        data = zip_path.read_bytes()
+        file_hash = hashlib.sha256(data).hexdigest()
+        
+        try:
+            with zipfile.ZipFile(io.BytesIO(data), 'r') as zf:
+                sources = self._sources_from_pack_meta(zf.read('pack.mcmeta'))
+        except:
+            sources = {}
+        
+        return file_hash, sources
     
     def _discover_datapack_sources(self, datapack_name: str, datapack_path: Path) -> dict:
-        """Try to discover datapack sources"""
+        """Try to discover datapack sources from an unpacked datapack folder"""
+        # Check for pack.mcmeta; a missing file just falls through to the except
+        try:
+            with open(datapack_path / 'pack.mcmeta', 'rb') as f:
+                return self._sources_from_pack_meta(f.read())
+        except:
+            return {}
+    
+    def _sources_from_pack_meta(self, raw: bytes) -> dict:
+        """Extract source URLs from a pack.mcmeta description"""
         sources = {}
         
-        # Check for pack.mcmeta
-        if datapack_path.is_dir():
-            pack_meta = datapack_path / 'pack.mcmeta'
-            if pack_meta.exists():
-                try:
-                    with open(pack_meta, 'r', encoding='utf-8') as f:
-                        meta = json.load(f)
-                        description = meta.get('pack', {}).get('description', '')
-                        
-                        # Try to extract URLs from description
-                        if 'github.com' in description:
-                            match = re.search(r'github\.com/([^/\s]+/[^/\s]+)', description)
-                            if match:
-                                sources['github_repo'] = match.group(1)
-                        
-                        if 'modrinth.com' in description:
-                            match = re.search(r'modrinth\.com/datapack/([^\s]+)', description)
-                            if match:
-                                sources['modrinth_id'] = match.group(1)
-                except:
-                    pass
+        meta = json_loads(raw)
+        description = meta.get('pack', {}).get('description', '')
+        
+        # Try to extract URLs from description
+        if 'github.com' in description:
+            match = _GITHUB_RE.search(description)
+            if match:
+                sources['github_repo'] = match.group(1)
+        
+        if 'modrinth.com' in description:
+            match = _MODRINTH_RE.search(description)
+            if match:
+                sources['modrinth_id'] = match.group(1)
         
         return sources
     
-    def _scan_server_properties(self, instance_id: str, props_file: Path):
-        """Scan server.properties file"""
+    def _scan_server_properties(self, instance_id: str, props_file: Path) -> Optional[tuple]:
+        """Scan server.properties file
+        
+        Returns:
+            instance_server_properties row, or None if the file is missing or can't be parsed
+        """
         try:
+            # One read and splitlines() instead of iterating the text file
+            with open(props_file, 'rb') as f:
+                text = f.read().decode('utf-8', errors='replace')
+            
             properties = {}
-            with open(props_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        properties[key.strip()] = value.strip()
+            for line in text.splitlines():
+                line = line.strip()
+                if line and line[0] != '#':
+                    key, sep, value = line.partition('=')
+                    if sep:
+                        properties[key.rstrip()] = value.lstrip()
             
             # Extract common properties
             level_name = properties.get('level-name', 'world')
@@ -373,35 +661,70 @@ class PluginMetadataPopulator:
             pvp = properties.get('pvp', 'true').lower() == 'true'
             spawn_protection = int(properties.get('spawn-protection', '16'))
             
-            cursor = self.db.conn.cursor()
-            cursor.execute("""
-                INSERT INTO instance_server_properties
-                (instance_id, level_name, gamemode, difficulty, max_players,
-                 view_distance, simulation_distance, pvp, spawn_protection,
-                 properties_json, last_updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    level_name = VALUES(level_name),
-                    gamemode = VALUES(gamemode),
-                    difficulty = VALUES(difficulty),
-                    max_players = VALUES(max_players),
-                    view_distance = VALUES(view_distance),
-                    simulation_distance = VALUES(simulation_distance),
-                    pvp = VALUES(pvp),
-                    spawn_protection = VALUES(spawn_protection),
-                    properties_json = VALUES(properties_json),
-                    last_updated_at = VALUES(last_updated_at)
-            """, (
+            return (
                 instance_id, level_name, gamemode, difficulty, max_players,
                 view_distance, simulation_distance, pvp, spawn_protection,
-                json.dumps(properties), datetime.now()
-            ))
-            
-            self.db.conn.commit()
-            logger.info(f"Registered server properties for {instance_id}")
+                json_dumps(properties),
+                self._run_ts
+            )
+        
+        except FileNotFoundError:
+            return None
         
         except Exception as e:
             logger.error(f"Failed to scan server.properties for {instance_id}: {e}")
+            return None
+
+
+def extract_jar_metadata(jar_path: Path) -> Tuple[Optional[PluginMeta], Optional[str]]:
+    """Read plugin.yml (or fabric.mod.json) and the SHA256 of a plugin JAR
+    
+    Module-level so it can run in the populator's process pool. The JAR is
+    read from disk once; the same bytes are hashed and opened as the zip.
+    
+    Returns:
+        (plugin_info, file_hash); plugin_info is None if no metadata could be read
+    """
+    try:
+        data = jar_path.read_bytes()
+        with zipfile.ZipFile(io.BytesIO(data), 'r') as zf:
+            # Try to read plugin.yml, streaming the entry straight into the loader
+            try:
+                with zf.open('plugin.yml') as plugin_yml:
+                    plugin_info = PluginMeta.from_plugin_yml(yaml.load(plugin_yml, Loader=SafeLoader))
+            except:
+                # Try fabric.mod.json
+                try:
+                    fabric_json_data = zf.read('fabric.mod.json')
+                    plugin_info = PluginMeta.from_fabric_mod_json(json_loads(fabric_json_data))
+                except:
+                    # Unknown plugin format
+                    logger.warning(f"Could not read metadata from {jar_path.name}")
+                    return None, None
+        
+        if plugin_info is None:
+            logger.warning(f"Could not read metadata from {jar_path.name}")
+            return None, None
+        
+        return plugin_info, hashlib.sha256(data).hexdigest()
+    
+    except Exception as e:
+        logger.warning(f"Failed to process JAR {jar_path.name}: {e}")
+        return None, None
+
+
+def _calculate_hash(file_path: Path) -> str:
+    """Calculate SHA256 hash of file"""
+    with open(file_path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            # Python 3.11+: hashed in C with the GIL released
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        
+        # Older Pythons: hash the whole mapping in one update call
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()  # mmap can't map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return hashlib.sha256(data).hexdigest()
 
 
 def main():
@@ -411,6 +734,12 @@ def main():
     parser = argparse.ArgumentParser(description='Populate plugin metadata')
     parser.add_argument('--amp-dir', default='/home/amp/.ampdata/instances',
                        help='AMP instances directory')
+    parser.add_argument('--workers', type=int, default=PluginMetadataPopulator.MAX_WORKERS,
+                       help='Instances to scan concurrently')
+    parser.add_argument('--full-rescan', action='store_true',
+                       help='Re-read JARs that are unchanged since the last scan')
+    parser.add_argument('--jar-processes', type=int, default=None,
+                       help='JAR metadata worker processes (default: CPU count, 0 extracts in-process)')
     
     args = parser.parse_args()
     
@@ -425,7 +754,9 @@ def main():
     db.connect()
     
     try:
-        populator = PluginMetadataPopulator(db, Path(args.amp_dir))
+        populator = PluginMetadataPopulator(db, Path(args.amp_dir), workers=args.workers,
+                                            jar_processes=args.jar_processes,
+                                            full_rescan=args.full_rescan)
         populator.populate_all()
     finally:
         db.disconnect()
@@ -9,13 +9,20 @@ Integrates with existing AgentService from service.py
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
-import subprocess
+from functools import lru_cache
+import asyncio
+import os
+import threading
+import time
 import logging
 import json
+import yaml
 from datetime import datetime
 
+from ..utils.serde import SafeDumper, SafeLoader
+
 logger = logging.getLogger('archivesmp-agent-api')
 
 app = FastAPI(
@@ -56,12 +63,50 @@ class AgentStatus(BaseModel):
     agent_version: str
 
 
+class RestartTracker:
+    """
+    Set of instances waiting for a restart.
+    
+    Guarded by a threading lock rather than an asyncio one because config
+    deployments add to it from worker threads as well as from the event loop.
+    """
+    
+    def __init__(self):
+        self._instances: set = set()
+        self._lock = threading.Lock()
+    
+    def add(self, instance: str):
+        with self._lock:
+            self._instances.add(instance)
+    
+    def discard(self, instance: str):
+        with self._lock:
+            self._instances.discard(instance)
+    
+    def clear(self):
+        with self._lock:
+            self._instances.clear()
+    
+    def snapshot(self) -> List[str]:
+        """Sorted copy of the instances currently needing a restart"""
+        with self._lock:
+            return sorted(self._instances)
+
+
 # Track which instances need restart
-needs_restart_instances: set = set()
+restart_tracker = RestartTracker()
 
 # Track last config deployment time
 last_config_deployment: Optional[datetime] = None
 
+# Plugin config writes in flight at once across all instances of a deployment
+MAX_DEPLOY_CONCURRENCY = 16
+_deploy_semaphore = asyncio.Semaphore(MAX_DEPLOY_CONCURRENCY)
+
+# Seconds a fallback instance listing is reused; the web UI polls status often
+INSTANCE_CACHE_TTL = 5
+_instance_cache: Dict[str, Any] = {'ts': 0.0, 'instances': None}
+
 
 @app.get("/api/agent/status")
 async def get_agent_status() -> AgentStatus:
@@ -73,7 +118,7 @@ async def get_agent_status() -> AgentStatus:
         return AgentStatus(
             server_name=_get_server_name(),
             instances=instances,
-            needs_restart=list(needs_restart_instances),
+            needs_restart=restart_tracker.snapshot(),
             last_config_update=last_config_deployment.isoformat() if last_config_deployment else None,
             agent_version="1.0.0"
         )
@@ -94,55 +139,13 @@ async def deploy_configs(request: ConfigDeploymentRequest) -> Dict[str, Any]:
         Deployment result with success/failure per instance
     """
     global last_config_deployment
-    results = {}
     
-    for instance_name, plugins_config in request.configs.items():
-        try:
-            # Get instance path
-            instance_path = Path(f"/home/amp/.ampdata/instances/{instance_name}")
-            
-            if not instance_path.exists():
-                results[instance_name] = {
-                    "success": False,
-                    "error": f"Instance directory not found: {instance_path}"
-                }
-                continue
-            
-            # Deploy each plugin config
-            plugin_results = {}
-            for plugin_name, config_data in plugins_config.items():
-                try:
-                    plugin_result = _deploy_plugin_config(
-                        instance_path, 
-                        plugin_name, 
-                        config_data
-                    )
-                    plugin_results[plugin_name] = plugin_result
-                    
-                except Exception as e:
-                    plugin_results[plugin_name] = {
-                        "success": False,
-                        "error": str(e)
-                    }
-            
-            # Check if all plugins deployed successfully
-            all_success = all(r.get("success", False) for r in plugin_results.values())
-            
-            results[instance_name] = {
-                "success": all_success,
-                "plugins": plugin_results
-            }
-            
-            # Mark instance as needing restart if any config changed
-            if all_success:
-                needs_restart_instances.add(instance_name)
-                logger.info(f"Instance {instance_name} marked for restart")
-            
-        except Exception as e:
-            results[instance_name] = {
-                "success": False,
-                "error": str(e)
-            }
+    # Instances (and the plugins within each) are deployed concurrently
+    instance_names = list(request.configs)
+    instance_results = await asyncio.gather(
+        *(_deploy_instance(name, request.configs[name]) for name in instance_names)
+    )
+    results = dict(zip(instance_names, instance_results))
     
     # Update last deployment timestamp if any deployment succeeded
     if any(r.get("success", False) for r in results.values()):
@@ -152,7 +155,7 @@ async def deploy_configs(request: ConfigDeploymentRequest) -> Dict[str, Any]:
         "success": all(r.get("success", False) for r in results.values()),
         "results": results,
         "timestamp": datetime.now().isoformat(),
-        "needs_restart": list(needs_restart_instances)
+        "needs_restart": restart_tracker.snapshot()
     }
 
 
@@ -170,11 +173,11 @@ async def restart_instances(request: RestartRequest) -> Dict[str, Any]:
     try:
         if request.restart_all:
             # Restart all instances on this server
-            result = _execute_amp_command("restartAll")
+            result = await _execute_amp_command("restartAll")
             
             # Clear all restart flags on success
             if result["success"]:
-                needs_restart_instances.clear()
+                restart_tracker.clear()
             
             return {
                 "success": result["success"],
@@ -183,21 +186,21 @@ async def restart_instances(request: RestartRequest) -> Dict[str, Any]:
                 "error": result.get("error", "")
             }
         else:
-            # Restart specific instances
-            restart_results = {}
+            # Restart specific instances concurrently
+            results = await asyncio.gather(
+                *(_execute_amp_command("restart", instance) for instance in request.instances)
+            )
+            restart_results = dict(zip(request.instances, results))
             
-            for instance in request.instances:
-                result = _execute_amp_command("restart", instance)
-                restart_results[instance] = result
-                
+            for instance, result in restart_results.items():
                 # Remove from needs_restart on success
-                if result["success"] and instance in needs_restart_instances:
-                    needs_restart_instances.remove(instance)
+                if result["success"]:
+                    restart_tracker.discard(instance)
             
             return {
                 "success": all(r.get("success", False) for r in restart_results.values()),
                 "results": restart_results,
-                "needs_restart": list(needs_restart_instances)
+                "needs_restart": restart_tracker.snapshot()
             }
             
     except Exception as e:
@@ -208,11 +211,11 @@ async def restart_instances(request: RestartRequest) -> Dict[str, Any]:
 @app.post("/api/agent/mark-restart-needed")
 async def mark_restart_needed(instance_name: str) -> Dict[str, Any]:
     """Mark an instance as needing restart (e.g., after plugin update)"""
-    needs_restart_instances.add(instance_name)
+    restart_tracker.add(instance_name)
     return {
         "success": True,
         "instance": instance_name,
-        "needs_restart": list(needs_restart_instances)
+        "needs_restart": restart_tracker.snapshot()
     }
 
 
@@ -225,18 +228,26 @@ def _discover_instances() -> List[str]:
     if agent_service:
         return agent_service.managed_instances
     
-    # Fallback if service not initialized
-    instances_dir = Path('/home/amp/.ampdata/instances')
-    
-    if not instances_dir.exists():
-        return []
+    # Fallback if service not initialized; reuse a recent listing
+    now = time.monotonic()
+    if _instance_cache['instances'] is not None and now - _instance_cache['ts'] < INSTANCE_CACHE_TTL:
+        return _instance_cache['instances']
     
     instances = []
-    for item in instances_dir.iterdir():
-        if item.is_dir() and (item / 'AMPConfig.conf').exists():
-            instances.append(item.name)
+    try:
+        # DirEntry.is_dir() answers from the dirent type, so only the
+        # AMPConfig.conf probe costs a stat per entry
+        with os.scandir('/home/amp/.ampdata/instances') as entries:
+            for entry in entries:
+                if entry.is_dir() and os.path.exists(os.path.join(entry.path, 'AMPConfig.conf')):
+                    instances.append(entry.name)
+        instances.sort()
+    except FileNotFoundError:
+        pass
     
-    return sorted(instances)
+    _instance_cache['ts'] = now
+    _instance_cache['instances'] = instances
+    return instances
 
 
 def _get_server_name() -> str:
@@ -244,7 +255,12 @@ def _get_server_name() -> str:
     if agent_service:
         return agent_service.physical_server
     
-    # Fallback: try to read from hostname or config
+    return _server_name_from_hostname()
+
+
+@lru_cache(maxsize=1)
+def _server_name_from_hostname() -> str:
+    """Fallback server name from the hostname, which doesn't change while running"""
     import socket
     hostname = socket.gethostname().lower()
     if 'hetzner' in hostname:
@@ -254,6 +270,70 @@ def _get_server_name() -> str:
     return "unknown"
 
 
+async def _deploy_instance(instance_name: str, plugins_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Deploy all plugin configs for one instance.
+    
+    Args:
+        instance_name: Instance directory name
+        plugins_config: {plugin_name: config_data} for this instance
+        
+    Returns:
+        Deployment result for the instance
+    """
+    try:
+        # Get instance path
+        instance_path = Path(f"/home/amp/.ampdata/instances/{instance_name}")
+        
+        if not instance_path.exists():
+            return {
+                "success": False,
+                "error": f"Instance directory not found: {instance_path}"
+            }
+        
+        # Deploy each plugin config
+        plugin_names = list(plugins_config)
+        outcomes = await asyncio.gather(
+            *(_deploy_plugin_config_async(instance_path, name, plugins_config[name]) for name in plugin_names),
+            return_exceptions=True
+        )
+        
+        plugin_results = {}
+        for plugin_name, outcome in zip(plugin_names, outcomes):
+            if isinstance(outcome, Exception):
+                plugin_results[plugin_name] = {
+                    "success": False,
+                    "error": str(outcome)
+                }
+            else:
+                plugin_results[plugin_name] = outcome
+        
+        # Check if all plugins deployed successfully
+        all_success = all(r.get("success", False) for r in plugin_results.values())
+        
+        # Mark instance as needing restart if any config changed
+        if all_success:
+            restart_tracker.add(instance_name)
+            logger.info(f"Instance {instance_name} marked for restart")
+        
+        return {
+            "success": all_success,
+            "plugins": plugin_results
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+async def _deploy_plugin_config_async(instance_path: Path, plugin_name: str, config_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Run _deploy_plugin_config in a worker thread, bounded by MAX_DEPLOY_CONCURRENCY"""
+    async with _deploy_semaphore:
+        return await asyncio.to_thread(_deploy_plugin_config, instance_path, plugin_name, config_data)
+
+
 def _deploy_plugin_config(instance_path: Path, plugin_name: str, config_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Deploy a plugin configuration to an instance using existing ConfigUpdater.
@@ -282,7 +362,7 @@ def _deploy_plugin_config(instance_path: Path, plugin_name: str, config_data: Di
             result = updater.apply_change(change_request)
             
             if result.get('success'):
-                needs_restart_instances.add(instance_path.name)
+                restart_tracker.add(instance_path.name)
                 logger.info(f"Successfully deployed {plugin_name} config to {instance_path.name}")
             
             return result
@@ -308,19 +388,18 @@ def _deploy_plugin_config(instance_path: Path, plugin_name: str, config_data: Di
         config_file.parent.mkdir(parents=True, exist_ok=True)
         
         # Write new config
-        import yaml
         with open(config_file, 'w') as f:
-            yaml.dump(config_data, f, default_flow_style=False, sort_keys=False)
+            yaml.dump(config_data, f, Dumper=SafeDumper, default_flow_style=False, sort_keys=False)
         
         # Verify write succeeded by reading back
         with open(config_file, 'r') as f:
-            written_data = yaml.safe_load(f)
+            written_data = yaml.load(f, Loader=SafeLoader)
         
         # Basic verification that file was written
         if not written_data:
             raise Exception("Config file verification failed - file is empty")
         
-        needs_restart_instances.add(instance_path.name)
+        restart_tracker.add(instance_path.name)
         logger.info(f"Successfully deployed {plugin_name} config to {instance_path.name}")
         
         return {
@@ -341,9 +420,35 @@ def _deploy_plugin_config(instance_path: Path, plugin_name: str, config_data: Di
         }
 
 
-def _execute_amp_command(command: str, instance: Optional[str] = None) -> Dict[str, Any]:
+async def _run_command(cmd: List[str], timeout: float) -> Tuple[int, bytes, bytes]:
     """
-    Execute ampinstmgr command.
+    Run a command as an asyncio subprocess so the event loop keeps serving requests.
+    
+    Args:
+        cmd: Command and arguments
+        timeout: Seconds before the process is killed and asyncio.TimeoutError is raised
+        
+    Returns:
+        (returncode, stdout, stderr)
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    
+    return proc.returncode, stdout, stderr
+
+
+async def _execute_amp_command(command: str, instance: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Execute ampinstmgr command without blocking the event loop.
     
     Args:
         command: Command to execute (restart, restartAll, stopAll, startAll, updateAll)
@@ -383,29 +488,26 @@ def _execute_amp_command(command: str, instance: Optional[str] = None) -> Dict[s
         logger.info(f"Executing: {' '.join(cmd)}")
         
         # Execute command
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
-        )
+        returncode, stdout, stderr = await _run_command(cmd, timeout=300)  # 5 minute timeout
         
-        success = result.returncode == 0
+        output = stdout.decode('utf-8', errors='replace')
+        error = stderr.decode('utf-8', errors='replace')
+        success = returncode == 0
         
         if success:
             logger.info(f"Command succeeded: {' '.join(cmd)}")
         else:
-            logger.error(f"Command failed: {' '.join(cmd)}\nStderr: {result.stderr}")
+            logger.error(f"Command failed: {' '.join(cmd)}\nStderr: {error}")
         
         return {
             "success": success,
             "command": ' '.join(cmd),
-            "returncode": result.returncode,
-            "output": result.stdout,
-            "error": result.stderr
+            "returncode": returncode,
+            "output": output,
+            "error": error
         }
         
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         logger.error(f"Command timed out: {command}")
         return {
             "success": False,
@@ -429,17 +531,15 @@ tile_sync_service = None
 async def start_tile_sync():
     """Start the Pl3xMap tile sync service"""
     try:
-        result = subprocess.run(
+        returncode, _, stderr = await _run_command(
             ["sudo", "systemctl", "start", "pl3xmap-tile-sync"],
-            capture_output=True,
-            text=True,
             timeout=10
         )
         
-        if result.returncode == 0:
+        if returncode == 0:
             return {"message": "Tile sync service started", "status": "running"}
         else:
-            raise HTTPException(status_code=500, detail=f"Failed to start service: {result.stderr}")
+            raise HTTPException(status_code=500, detail=f"Failed to start service: {stderr.decode('utf-8', errors='replace')}")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -449,17 +549,15 @@ async def start_tile_sync():
 async def stop_tile_sync():
     """Stop the Pl3xMap tile sync service"""
     try:
-        result = subprocess.run(
+        returncode, _, stderr = await _run_command(
             ["sudo", "systemctl", "stop", "pl3xmap-tile-sync"],
-            capture_output=True,
-            text=True,
             timeout=10
         )
         
-        if result.returncode == 0:
+        if returncode == 0:
             return {"message": "Tile sync service stopped", "status": "stopped"}
         else:
-            raise HTTPException(status_code=500, detail=f"Failed to stop service: {result.stderr}")
+            raise HTTPException(status_code=500, detail=f"Failed to stop service: {stderr.decode('utf-8', errors='replace')}")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -470,14 +568,12 @@ async def get_tile_sync_status():
     """Get status of tile sync service"""
     try:
         # Check systemd service status
-        result = subprocess.run(
+        _, stdout, _ = await _run_command(
             ["systemctl", "is-active", "pl3xmap-tile-sync"],
-            capture_output=True,
-            text=True,
             timeout=5
         )
         
-        status = "running" if result.stdout.strip() == "active" else "stopped"
+        status = "running" if stdout.strip() == b"active" else "stopped"
         
         # Get watched instances (if service is running)
         instances = []
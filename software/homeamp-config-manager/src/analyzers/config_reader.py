@@ -2,23 +2,42 @@
 Simple plugin config reader - reads YAML config files
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import yaml
 import logging
 
+from ..utils.serde import SafeLoader
+
 logger = logging.getLogger(__name__)
 
 
+def _read_file(path: str) -> Optional[bytes]:
+    """Read a whole file; open/read/close release the GIL so this runs in parallel"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError as e:
+        logger.warning(f"Failed to read {path}: {e}")
+        return None
+
+
 class PluginConfigReader:
     """Reads plugin configuration files"""
     
-    def __init__(self, plugins_dir: Path):
+    # Threads for batched config file reads (I/O-bound)
+    MAX_WORKERS = min(8, os.cpu_count() or 1)
+    
+    def __init__(self, plugins_dir: Path, workers: int = MAX_WORKERS):
         """
         Args:
             plugins_dir: Path to plugins directory
+            workers: Number of threads used to read config files
         """
         self.plugins_dir = Path(plugins_dir)
+        self.workers = max(1, workers)
     
     def read_all_configs(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
         """
@@ -29,37 +48,45 @@ class PluginConfigReader:
         """
         configs = {}
         
-        if not self.plugins_dir.exists():
+        try:
+            plugin_entries = list(os.scandir(self.plugins_dir))
+        except FileNotFoundError:
             return configs
         
-        # Scan for plugin folders
-        for plugin_dir in self.plugins_dir.iterdir():
-            if not plugin_dir.is_dir():
+        # Collect every YAML/YML file up front so the reads can be batched
+        candidates: List[Tuple[str, str, str]] = []
+        for plugin_entry in plugin_entries:
+            if not plugin_entry.is_dir():
                 continue
             
-            plugin_name = plugin_dir.name
-            plugin_configs = {}
-            
-            # Read all YAML/YML files in plugin directory
-            for config_file in plugin_dir.glob("*.yml"):
-                try:
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        data = yaml.safe_load(f)
-                        if data:
-                            plugin_configs[config_file.name] = data
-                except Exception as e:
-                    logger.warning(f"Failed to read {config_file}: {e}")
-            
-            for config_file in plugin_dir.glob("*.yaml"):
-                try:
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        data = yaml.safe_load(f)
-                        if data:
-                            plugin_configs[config_file.name] = data
-                except Exception as e:
-                    logger.warning(f"Failed to read {config_file}: {e}")
-            
-            if plugin_configs:
-                configs[plugin_name] = plugin_configs
+            # One listing per plugin folder, no per-file stat
+            try:
+                with os.scandir(plugin_entry.path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(('.yml', '.yaml')) and entry.is_file():
+                            candidates.append((plugin_entry.name, entry.name, entry.path))
+            except OSError as e:
+                logger.warning(f"Failed to list {plugin_entry.path}: {e}")
+        
+        if not candidates:
+            return configs
+        
+        paths = [path for _, _, path in candidates]
+        if self.workers > 1 and len(paths) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                contents = list(executor.map(_read_file, paths))
+        else:
+            contents = [_read_file(path) for path in paths]
+        
+        # Parse in the calling thread; YAML construction is CPU-bound
+        for (plugin_name, file_name, path), raw in zip(candidates, contents):
+            if raw is None:
+                continue
+            try:
+                data = yaml.load(raw.decode('utf-8'), Loader=SafeLoader)
+                if data:
+                    configs.setdefault(plugin_name, {})[file_name] = data
+            except Exception as e:
+                logger.warning(f"Failed to read {path}: {e}")
         
         return configs
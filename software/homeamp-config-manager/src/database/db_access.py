@@ -4,20 +4,51 @@ Database Access Layer for Configuration Management
 Provides data access methods for the asmp_config MariaDB database.
 """
 
+import random
+import threading
+import time
 import mysql.connector
-from mysql.connector import Error
-from typing import Dict, List, Any, Optional, Tuple
+from mysql.connector import Error, errorcode
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# InnoDB lock conflicts; the failed transaction is rolled back and can be replayed
+LOCK_RETRY_ERRNOS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+
+def retry_on_lock_conflict(write: Callable[[], Any], attempts: int = 4, description: str = 'transaction') -> Any:
+    """
+    Run a write transaction, replaying it on InnoDB deadlocks and lock wait timeouts
+    
+    Args:
+        write: Performs and commits the transaction; must roll back on error
+        attempts: Total attempts before the lock error is raised
+        description: What is being written, for the retry log message
+        
+    Returns:
+        Whatever write returns
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return write()
+        except Error as e:
+            if e.errno not in LOCK_RETRY_ERRNOS or attempt == attempts:
+                raise
+            delay = random.uniform(0, 0.1 * 2 ** attempt)
+            logger.warning(f"Lock conflict {description} ({e.msg}), "
+                           f"retrying in {delay:.2f}s (attempt {attempt}/{attempts})")
+            time.sleep(delay)
+
 
 class ConfigDatabase:
     """Database connection and query interface"""
     
-    def __init__(self, host: str, port: int, user: str, password: str, database: str = 'asmp_config'):
+    def __init__(self, host: str, port: int, user: str, password: str, database: str = 'asmp_config',
+                 allow_local_infile: bool = False):
         """
         Initialize database connection
         
@@ -27,6 +58,7 @@ class ConfigDatabase:
             user: Database user
             password: Database password
             database: Database name
+            allow_local_infile: Allow LOAD DATA LOCAL INFILE for bulk loads
         """
         self.config = {
             'host': host,
@@ -34,7 +66,10 @@ class ConfigDatabase:
             'user': user,
             'password': password,
             'database': database,
-            'autocommit': False
+            'autocommit': False,
+            # C extension protocol codec; falls back to pure Python if it is missing
+            'use_pure': False,
+            'allow_local_infile': allow_local_infile
         }
         self.conn = None
         self.cursor = None
@@ -45,6 +80,8 @@ class ConfigDatabase:
             self.conn = mysql.connector.connect(**self.config)
             self.cursor = self.conn.cursor(dictionary=True)
             logger.info(f"Connected to database {self.config['database']} at {self.config['host']}")
+            if not mysql.connector.HAVE_CEXT:
+                logger.warning("mysql-connector C extension not available, using the slower pure-Python protocol")
         except Error as e:
             logger.error(f"Database connection error: {e}")
             raise
@@ -67,6 +104,18 @@ class ConfigDatabase:
         if self.conn:
             self.conn.rollback()
     
+    def clone(self) -> 'ConfigDatabase':
+        """Create an unconnected ConfigDatabase with the same connection settings"""
+        config = self.config
+        return ConfigDatabase(
+            host=config['host'],
+            port=config['port'],
+            user=config['user'],
+            password=config['password'],
+            database=config['database'],
+            allow_local_infile=config['allow_local_infile']
+        )
+    
     # ========================================================================
     # INSTANCE QUERIES
     # ========================================================================
@@ -313,3 +362,41 @@ class ConfigDatabase:
             WHERE mt.tag_name = %s
         """, (tag_name,))
         return [row['instance_id'] for row in self.cursor.fetchall()]
+
+
+class ThreadLocalDatabases:
+    """
+    One ConfigDatabase per thread, since mysql-connector connections are not thread-safe.
+    
+    The thread that creates the pool uses the primary connection; other threads get
+    a clone of it, connected on first use and closed by close_workers().
+    """
+    
+    def __init__(self, primary: ConfigDatabase):
+        """
+        Args:
+            primary: Connected database used by the creating thread
+        """
+        self.primary = primary
+        self._local = threading.local()
+        self._local.db = primary
+        self._workers: List[ConfigDatabase] = []
+        self._lock = threading.Lock()
+    
+    def get(self) -> ConfigDatabase:
+        """Get the current thread's database connection, opening one if needed"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self.primary.clone()
+            db.connect()
+            self._local.db = db
+            with self._lock:
+                self._workers.append(db)
+        return db
+    
+    def close_workers(self):
+        """Disconnect every connection opened for other threads"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for db in workers:
+            db.disconnect()
@@ -0,0 +1,148 @@
+"""
+HTTP Response Cache
+
+Persists ETag/Last-Modified validators and response bodies in SQLite so
+repeated API scans can send conditional requests and reuse unchanged bodies.
+Responses still fresh per Cache-Control max-age are served without a request.
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+
+
+class HttpCache:
+    """SQLite-backed cache for conditional GET requests"""
+
+    def __init__(self, db_path: Path):
+        """
+        Initialize cache
+
+        Args:
+            db_path: SQLite file to store cached responses in
+        """
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB,
+                expires_at REAL
+            )
+        """)
+        # Caches created before freshness support lack expires_at
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(http_cache)")}
+        if 'expires_at' not in columns:
+            self.conn.execute("ALTER TABLE http_cache ADD COLUMN expires_at REAL")
+        self.conn.commit()
+
+    def close(self):
+        """Close the cache database"""
+        self.conn.close()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Build a stable cache key from URL and query parameters"""
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted(params.items()))}"
+
+    @staticmethod
+    def freshness(headers) -> Tuple[bool, Optional[float]]:
+        """
+        Read caching directives from response headers
+
+        Returns:
+            (storable, expires_at) - expires_at is None when the response
+            must be revalidated before reuse
+        """
+        directives = {}
+        for part in headers.get('Cache-Control', '').split(','):
+            name, _, value = part.strip().partition('=')
+            directives[name.lower()] = value.strip('"')
+
+        if 'no-store' in directives:
+            return False, None
+        if 'no-cache' in directives:
+            return True, None
+
+        try:
+            max_age = float(directives.get('max-age', ''))
+        except ValueError:
+            return True, None
+
+        return True, time.time() + max_age
+
+    def lookup(self, key: str) -> Optional[Tuple[Optional[str], Optional[str], bytes, Optional[float]]]:
+        """Get (etag, last_modified, body, expires_at) for a cached URL"""
+        return self.conn.execute(
+            "SELECT etag, last_modified, body, expires_at FROM http_cache WHERE url = ?",
+            (key,)
+        ).fetchone()
+
+    def store(self, key: str, etag: Optional[str], last_modified: Optional[str], body: bytes,
+              expires_at: Optional[float] = None):
+        """Store validators, body and freshness for a URL"""
+        self.conn.execute("""
+            INSERT OR REPLACE INTO http_cache (url, etag, last_modified, body, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (key, etag, last_modified, body, expires_at))
+        self.conn.commit()
+
+    def refresh(self, key: str, expires_at: Optional[float]):
+        """Update freshness of a revalidated entry"""
+        self.conn.execute("UPDATE http_cache SET expires_at = ? WHERE url = ?", (expires_at, key))
+        self.conn.commit()
+
+    async def get_json(self, session: httpx.AsyncClient, url: str,
+                       params: Optional[Dict[str, Any]] = None) -> Tuple[int, Any]:
+        """
+        GET a JSON resource, revalidating against the cached copy
+
+        Serves a fresh cached body without a request. Otherwise sends
+        If-None-Match/If-Modified-Since when validators are cached and
+        serves the cached body on 304 Not Modified.
+
+        Returns:
+            (status, data) - data is None unless status is 200
+        """
+        key = self.make_key(url, params)
+        cached = self.lookup(key)
+
+        if cached and cached[3] and cached[3] > time.time():
+            return 200, json.loads(cached[2])
+
+        headers = {}
+        if cached:
+            etag, last_modified, _, _ = cached
+            if etag:
+                # Sent back exactly as received, including quotes / W/ prefix
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = await session.get(url, params=params, headers=headers)
+
+        if response.status_code == 304 and cached:
+            self.refresh(key, self.freshness(response.headers)[1])
+            return 200, json.loads(cached[2])
+
+        if response.status_code != 200:
+            return response.status_code, None
+
+        body = response.content
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        storable, expires_at = self.freshness(response.headers)
+        if storable and (etag or last_modified or expires_at):
+            self.store(key, etag, last_modified, body, expires_at)
+
+        return 200, json.loads(body)
@@ -0,0 +1,95 @@
+"""
+Async API Client Base
+
+Shared setup for the async plugin repository clients: a pooled HTTP/2 httpx
+session behind RetryTransport, the SQLite response cache, a concurrency
+semaphore and coalescing of identical in-flight requests.
+"""
+
+import asyncio
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import httpx
+
+from .http_cache import HttpCache
+from .http_retry import RetryTransport
+
+
+class AsyncApiClient:
+    """Async context manager owning the HTTP session and response cache"""
+
+    USER_AGENT = 'ArchiveSMP-ConfigManager/1.0'
+    MAX_CONCURRENCY = 20
+
+    def __init__(self, cache_path: Path, max_retries: int = 3, backoff_seconds: float = 2.0):
+        """
+        Initialize client
+
+        Args:
+            cache_path: SQLite file for the response cache
+            max_retries: Retries for 429/5xx responses and transport errors
+            backoff_seconds: Base retry delay, doubled on each attempt
+        """
+        self.cache_path = cache_path
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.session: Optional[httpx.AsyncClient] = None
+        self.cache: Optional[HttpCache] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def __aenter__(self):
+        # HTTP/2 multiplexes the concurrent requests over a few pooled connections;
+        # 429/5xx responses are retried with backoff instead of skipping the request
+        self.session = httpx.AsyncClient(
+            headers={'User-Agent': self.USER_AGENT},
+            timeout=10.0,
+            transport=RetryTransport(
+                httpx.AsyncHTTPTransport(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=50, max_keepalive_connections=30)
+                ),
+                max_retries=self.max_retries,
+                backoff_seconds=self.backoff_seconds
+            )
+        )
+        self._semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+        self.cache = HttpCache(self.cache_path)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.aclose()
+        self.session = None
+        self.cache.close()
+        self.cache = None
+
+    async def _coalesce(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Share one in-flight request between concurrent callers with the same key
+
+        Args:
+            key: Identifies identical requests
+            fetch: Starts the request when none is in flight for key
+
+        Returns:
+            Result of the shared request
+        """
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # Shielded so a cancelled waiter doesn't cancel the shared result
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fetch()
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._inflight[key]
+
+        return result
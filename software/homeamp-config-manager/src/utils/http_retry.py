@@ -0,0 +1,85 @@
+"""
+HTTP Retry Transport
+
+httpx transport wrapper that retries rate-limited (429) and transient 5xx
+responses with exponential backoff and full jitter, honoring Retry-After.
+"""
+
+import asyncio
+import logging
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """Retry wrapper around another async httpx transport"""
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_retries: int = 3,
+                 backoff_seconds: float = 2.0, max_backoff_seconds: float = 30.0):
+        """
+        Initialize retry transport
+
+        Args:
+            transport: Underlying transport that performs the requests
+            max_retries: Retries after the first attempt
+            backoff_seconds: Base delay, doubled on each attempt
+            max_backoff_seconds: Upper bound for a single delay
+        """
+        self.transport = transport
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.debug(f"{request.method} {request.url} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                await response.aclose()
+                logger.debug(f"{request.method} {request.url} returned {response.status_code}, "
+                             f"retrying in {delay:.1f}s")
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * (2 ** attempt)))
+
+    def _retry_after(self, response: httpx.Response) -> Optional[float]:
+        """Parse a Retry-After header (seconds or HTTP-date), capped at max backoff"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+
+        return min(max(delay, 0.0), self.max_backoff_seconds)
@@ -0,0 +1,88 @@
+"""
+Plugin Metadata Updates
+
+Batched writes of metadata fetched from plugin repositories (Hangar,
+Modrinth) into the plugins table, touching only the columns that change.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def changed_columns(current: Dict[str, Any], values: Dict[str, Any],
+                    fill_columns: Sequence[str]) -> Dict[str, Any]:
+    """
+    Keep only the fetched values that would change the stored row
+
+    Args:
+        current: Stored column values (empty if the row wasn't found)
+        values: Fetched column values
+        fill_columns: Columns only filled in while the stored value is NULL/empty
+
+    Returns:
+        Column values to write
+    """
+    changes = {}
+    for column, value in values.items():
+        if column in fill_columns:
+            if current.get(column) in (None, '') and value not in (None, ''):
+                changes[column] = value
+        elif column not in current or current[column] != value:
+            changes[column] = value
+    return changes
+
+
+def write_plugin_updates(conn, updates: List[Tuple[str, Dict[str, Any]]],
+                         replace_columns: Sequence[str], fill_columns: Sequence[str],
+                         batch_size: int = 1000):
+    """
+    Write fetched plugin metadata in batches with a single commit
+
+    Current values are read in bulk first so only columns that actually
+    change are written; plugins sharing the same set of changed columns
+    go out together in one executemany.
+
+    Args:
+        conn: Open MariaDB connection
+        updates: (plugin_id, column values) pairs
+        replace_columns: Columns overwritten when the fetched value differs
+        fill_columns: Columns only filled in while the stored value is NULL/empty
+        batch_size: Plugins per SELECT/executemany batch
+    """
+    if not updates:
+        return
+
+    cursor = conn.cursor()
+    columns = tuple(replace_columns) + tuple(fill_columns)
+    plugin_ids = [plugin_id for plugin_id, _ in updates]
+
+    current = {}
+    for i in range(0, len(plugin_ids), batch_size):
+        batch = plugin_ids[i:i + batch_size]
+        placeholders = ', '.join(['%s'] * len(batch))
+        cursor.execute(
+            f"SELECT plugin_id, {', '.join(columns)} FROM plugins WHERE plugin_id IN ({placeholders})",
+            batch
+        )
+        for row in cursor.fetchall():
+            current[row[0]] = dict(zip(columns, row[1:]))
+
+    checked_at = datetime.now()
+    groups: Dict[Tuple[str, ...], List[tuple]] = {}
+    for plugin_id, values in updates:
+        changes = changed_columns(current.get(plugin_id, {}), values, fill_columns)
+        groups.setdefault(tuple(changes), []).append(
+            (*changes.values(), checked_at, plugin_id)
+        )
+
+    for set_columns, rows in groups.items():
+        set_clause = ''.join(f"{column} = %s, " for column in set_columns)
+        sql = f"UPDATE plugins SET {set_clause}last_checked_at = %s WHERE plugin_id = %s"
+        for i in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[i:i + batch_size])
+
+    conn.commit()
+    logger.info(f"Updated {len(updates)} plugins ({len(groups)} column sets)")
@@ -0,0 +1,53 @@
+"""
+Serialization Helpers
+
+YAML loader/dumper and JSON functions that use the C-accelerated libraries
+(libyaml, orjson) when installed and fall back to the pure-Python ones.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    # libyaml-backed loader/dumper, several times faster than the pure-Python ones
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json works fine
+    orjson = None
+
+__all__ = ['SafeLoader', 'SafeDumper', 'json_loads', 'json_dumps']
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON document
+
+    Args:
+        data: JSON text or UTF-8 bytes
+
+    Returns:
+        Parsed value
+    """
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any, indent: bool = False) -> str:
+    """
+    Serialize a value to JSON text
+
+    Args:
+        obj: Value to serialize
+        indent: Pretty-print with two-space indentation
+
+    Returns:
+        JSON text
+    """
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+    return json.dumps(obj, indent=2 if indent else None)